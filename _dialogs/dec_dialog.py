@@ -1,8 +1,9 @@
+import time
 from enum import Enum
 from PyQt5.QtWidgets import QDialog, QWidget
 from layouts import dec_cal_ui
 from tools import DecCalc as dc
-from tools import MiniTars
+from tools import Acquisition, RAW_DEC
 
 class NorthSouth(Enum):
     NORTH = 0
@@ -13,8 +14,9 @@ class DecDialog(QDialog):
 
     CAL_FILENAME = "dec-cal.txt"
     CAL_BACKUP_FILENAME = "dec-cal-backup.txt"
+    SAMPLE_TIMEOUT = 1.0  # s to wait for a declinometer reading after a click
 
-    def __init__(self, minitars: MiniTars, threepio):
+    def __init__(self, acquisition: Acquisition, threepio):
         QWidget.__init__(self)
         self.ui = dec_cal_ui.Ui_Dialog()
         self.ui.setupUi(self)
@@ -30,7 +32,7 @@ class DecDialog(QDialog):
         self.ui.warning_label.hide()
         self.update_labels()
 
-        self.minitars = minitars
+        self.acquisition = acquisition
         self.threepio = threepio
 
         # Connect buttons
@@ -66,9 +68,11 @@ class DecDialog(QDialog):
         self.threepio.beep(message="DecDialog.handle_record")
 
         # Read just the declination value
-        new_dec = None
-        while new_dec is None:
-            new_dec = self.minitars.read_latest()
+        new_dec = self.read_raw_dec()
+        if new_dec is None:
+            self.ui.warning_label.setText("Error: no reading from the declinometer")
+            self.ui.warning_label.show()
+            return
 
         self.data[self.current_dec] = new_dec
 
@@ -87,6 +91,19 @@ class DecDialog(QDialog):
 
         self.update_labels()
 
+    def read_raw_dec(self) -> float | None:
+        """The declinometer's reading in the first sample published after now, or
+        None if there isn't one within SAMPLE_TIMEOUT"""
+        feed = self.acquisition.ring.subscribe()
+        deadline = time.monotonic() + self.SAMPLE_TIMEOUT
+        while True:
+            rows = feed.poll()
+            if len(rows) > 0:
+                return float(rows[0, RAW_DEC])
+            if not self.acquisition.is_alive() or time.monotonic() > deadline:
+                return None
+            time.sleep(self.acquisition.POLL_PERIOD)
+
     def handle_save(self):
         try:
             self.complete_calibration()
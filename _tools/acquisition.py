@@ -0,0 +1,85 @@
+"""
+Background worker that owns the DATAQ and declinometer serial ports, so that nothing
+happening on the GUI thread can hold up sampling.
+"""
+
+import threading
+
+import numpy as np
+
+from .samplering import SampleRing, TIME, RAW_DEC, DEC, A, B, COLUMNS
+
+
+class Acquisition(threading.Thread):
+    """
+    Polls Tars and MiniTars, timestamps every sample the moment it is read and
+    publishes it into a SampleRing. Tars delivers samples in blocks, so each sample
+    in a block is stamped back from the read time by its position in the block.
+
+    A poll that raises is retried on the next period, and the error is kept for the
+    GUI to collect with take_error(); after MAX_FAILURES in a row the thread gives
+    up and sets 'failed'.
+    """
+
+    POLL_PERIOD = 0.01  # s
+    MAX_FAILURES = 100  # Consecutive failed polls, about a second's worth
+
+    def __init__(self, tars, minitars, dec_calc, clock, ring: SampleRing):
+        super().__init__(name="acquisition", daemon=True)
+        self.tars = tars
+        self.minitars = minitars
+        self.dec_calc = dec_calc
+        self.clock = clock
+        self.ring = ring
+
+        self.raw_dec: float | None = None  # Latest declinometer reading
+        self.failed = False  # Gave up after MAX_FAILURES failed polls in a row
+        self.__error: Exception | None = None  # Latest, until taken
+        self.__error_lock = threading.Lock()
+        self.__stopped = threading.Event()
+
+    def run(self):
+        failures = 0
+        while not self.__stopped.is_set():
+            try:
+                self.poll()
+                failures = 0
+            except Exception as e:
+                with self.__error_lock:
+                    self.__error = e
+                failures += 1
+                if failures >= self.MAX_FAILURES:
+                    self.failed = True
+                    return
+            self.__stopped.wait(self.POLL_PERIOD)
+
+    def take_error(self) -> Exception | None:
+        """The latest exception raised by a poll since the previous call, if any"""
+        with self.__error_lock:
+            error, self.__error = self.__error, None
+        return error
+
+    def stop(self):
+        self.__stopped.set()
+        if self.is_alive():
+            self.join()
+
+    def poll(self):
+        """Read both devices once and publish whatever the DATAQ had for us"""
+        block = self.tars.read_block()
+        timestamp = self.clock.get_sidereal_seconds()
+
+        raw_dec = self.minitars.read_latest()
+        if raw_dec is not None:
+            self.raw_dec = raw_dec
+        if block is None or self.raw_dec is None:
+            return
+
+        rows = np.empty((len(block), COLUMNS))
+        sample_period = self.clock.solar_to_sidereal(1 / self.tars.SAMPLE_RATE)
+        rows[:, TIME] = timestamp - sample_period * np.arange(len(block))[::-1]
+        rows[:, RAW_DEC] = self.raw_dec
+        rows[:, DEC] = self.dec_calc.calculate_declination(self.raw_dec)
+        rows[:, A] = block[:, 0]
+        rows[:, B] = block[:, 1]
+        self.ring.push(rows)
@@ -0,0 +1,107 @@
+from math import floor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def lowpass_taps(length: int, cutoff: float) -> np.ndarray:
+    """Blackman-windowed sinc low-pass filter with unity DC gain; cutoff in cycles
+    per sample"""
+    n = np.arange(length) - (length - 1) / 2
+    taps = np.sinc(2 * cutoff * n) * np.blackman(length)
+    return taps / np.sum(taps)
+
+
+class Decimator:
+    """
+    Streaming anti-aliasing FIR decimator. Blocks of (timestamp, dec, a, b) samples
+    go in at 'input_rate', filtered samples come out at exactly 'output_rate' on
+    average, even when the ratio of the two is not a whole number. Only the output
+    samples are ever computed, and the last 'taps - 1' inputs are carried over
+    between blocks so block boundaries make no difference to the output. reset()
+    forgets them, for when the input changes abruptly (a new state, a new
+    frequency), so that nothing from before smears into what comes after.
+
+    Args:
+        input_rate (float): in Hz
+        output_rate (float): in Hz
+        span (float): filter length, in output periods
+    """
+
+    def __init__(self, input_rate: float, output_rate: float, span: float):
+        self.input_rate = input_rate
+        self.span = span
+        self.history = np.empty((0, 4))
+        self.output_rate = 0.0
+        self.step = 0.0  # Input samples per output sample
+        self.taps = np.ones(1)
+
+        # Output positions are counted in input samples from the very first input,
+        # so that the output doesn't depend on how the input was split into blocks
+        self.start = 0  # Position of the first row of history
+        self.anchor = 0.0  # Position of the first output at the current rate
+        self.outputs = 0  # Outputs since anchor
+        self.padding = False  # Whether to extend the next block back in time
+        self.set_output_rate(output_rate)
+
+    def set_output_rate(self, output_rate: float):
+        """Change rate without losing the samples already in the filter"""
+        if output_rate == self.output_rate:
+            return
+        next_output = self.anchor + self.step * self.outputs
+        self.output_rate = output_rate
+        self.step = self.input_rate / output_rate
+        length = int(self.span * self.step) | 1  # Odd, so the delay is whole
+        self.taps = lowpass_taps(length, 0.5 / self.step)
+        self.anchor = max(next_output, self.start + length - 1)
+        self.outputs = 0
+
+    def reset(self):
+        """Forget every sample so far. The next block is extended back by repeating
+        its first sample, so the first output is centred on that sample."""
+        self.start += len(self.history)
+        self.history = np.empty((0, 4))
+        self.padding = True
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Filter a block of (timestamp, dec, a, b) rows; returns the output rows"""
+        if self.padding and len(block) > 0:
+            self.__pad(block[0])
+        length = len(self.taps)
+        buffer = np.concatenate((self.history, block))
+
+        end = self.start + len(buffer)  # Position after the last row
+        last = floor((end - 1 - self.anchor) / self.step)  # Last output that fits
+        while self.__position(last + 1) < end:  # Correct for rounding
+            last += 1
+        while last >= self.outputs and self.__position(last) >= end:
+            last -= 1
+        outputs = np.arange(self.outputs, last + 1)
+        indices = (self.anchor + self.step * outputs).astype(int) - self.start
+        count = len(indices)
+        self.outputs += count
+
+        output = np.empty((count, 4))
+        if count > 0:
+            windows = sliding_window_view(buffer[:, 1:], length, axis=0)
+            output[:, 1:] = windows[indices - (length - 1)] @ self.taps
+            output[:, 0] = buffer[indices - (length - 1) // 2, 0]  # Group delay
+
+        keep = min(len(buffer), length - 1)
+        self.history = buffer[len(buffer) - keep:]
+        self.start = end - keep
+        return output
+
+    def __position(self, output: int) -> int:
+        return int(self.anchor + self.step * output)
+
+    def __pad(self, first: np.ndarray):
+        """Fill the filter with copies of 'first', timestamped as if they came
+        before it, and start outputs once the filter is centred on 'first'"""
+        count = len(self.taps) - 1
+        self.history = np.repeat(first[np.newaxis], count, axis=0)
+        self.history[:, 0] = first[0] - np.arange(count, 0, -1) / self.input_rate
+        self.anchor = self.start + count // 2  # 'first' is at start, in the middle
+        self.start -= count
+        self.outputs = 0
+        self.padding = False
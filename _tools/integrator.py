@@ -0,0 +1,81 @@
+from math import inf, sqrt
+
+import numpy as np
+
+from tools import DataPoint
+
+
+class Integrator:
+    """
+    Boxcar integrator: accumulates every sample between two writes so that the mean
+    can be written instead of whichever sample happened to be latest. Adding a
+    sample only updates running sums, so it costs the same no matter how many
+    samples have been accumulated.
+    """
+
+    def __init__(self, stats: bool = False):
+        self.stats = stats  # Also track min, max and standard deviation of A and B
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.sum_time = 0.0
+        self.sum_dec = 0.0
+        self.sum_a = 0.0
+        self.sum_b = 0.0
+        self.sum_sq_a = 0.0
+        self.sum_sq_b = 0.0
+        self.min_a = inf
+        self.min_b = inf
+        self.max_a = -inf
+        self.max_b = -inf
+
+    def add(self, timestamp: float, dec: float, a: float, b: float):
+        self.count += 1
+        self.sum_time += timestamp
+        self.sum_dec += dec
+        self.sum_a += a
+        self.sum_b += b
+        if self.stats:
+            self.sum_sq_a += a * a
+            self.sum_sq_b += b * b
+            if a < self.min_a:
+                self.min_a = a
+            if a > self.max_a:
+                self.max_a = a
+            if b < self.min_b:
+                self.min_b = b
+            if b > self.max_b:
+                self.max_b = b
+
+    def add_block(self, timestamp, dec, a, b):
+        """Same as add(), for equal-length arrays of samples"""
+        if len(timestamp) == 0:
+            return
+        self.count += len(timestamp)
+        self.sum_time += float(np.sum(timestamp))
+        self.sum_dec += float(np.sum(dec))
+        self.sum_a += float(np.sum(a))
+        self.sum_b += float(np.sum(b))
+        if self.stats:
+            self.sum_sq_a += float(np.dot(a, a))
+            self.sum_sq_b += float(np.dot(b, b))
+            self.min_a = min(self.min_a, float(np.min(a)))
+            self.max_a = max(self.max_a, float(np.max(a)))
+            self.min_b = min(self.min_b, float(np.min(b)))
+            self.max_b = max(self.max_b, float(np.max(b)))
+
+    def mean(self) -> DataPoint:
+        """Mean of everything accumulated since the last reset; timestamped at the
+        middle of the integration window"""
+        n = self.count
+        return DataPoint(
+            self.sum_time / n, self.sum_dec / n, self.sum_a / n, self.sum_b / n
+        )
+
+    def std(self) -> tuple[float, float]:
+        """Standard deviation of channels A and B; requires stats"""
+        n = self.count
+        var_a = self.sum_sq_a / n - (self.sum_a / n) ** 2
+        var_b = self.sum_sq_b / n - (self.sum_b / n) ** 2
+        return sqrt(max(var_a, 0.0)), sqrt(max(var_b, 0.0))
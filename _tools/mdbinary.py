@@ -0,0 +1,208 @@
+"""
+Compact binary counterpart to the .md1/.md2 text files, and a zero-copy reader for it.
+
+Layout, all little-endian:
+    0   magic, 8 bytes
+    8   number of records (uint64), 0 until the file is closed
+    16  byte offset of the footer (uint64), 0 until the file is closed
+    64  records of RECORD_DTYPE, one per data point
+    ... footer: JSON with the segments and the metadata from write_meta
+If a file was never closed, the records are still readable; only the footer is lost.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from tools import DataPoint
+
+MAGIC = b"3PIOMDB1"
+HEADER_SIZE = 64
+RECORD_DTYPE = np.dtype(
+    [
+        ("timestamp", "<f8"),  # Sidereal seconds
+        ("dec", "<f4"),
+        ("a", "<f4"),
+        ("b", "<f4"),
+    ]
+)
+
+
+class BinaryPrecious:
+    """
+    Binary observation file that takes the same stream of writes as MyPrecious:
+    DataPoints become records, "* LABEL" starts a new segment called LABEL, and
+    "KEY: value" lines are kept as metadata. Like MyPrecious, nothing touches the
+    disk until the first record is written.
+    """
+
+    BUFFER_SIZE = 64 * 1024  # bytes
+
+    def __init__(self, filename: str, directory: str = "./data/"):
+        self.filename = filename
+        self.dir = directory
+        self.count = 0
+        self.segments: list[dict] = []
+        self.meta: dict[str, str] = {}
+        self.__file = None
+        self.__closed = False
+
+    def __del__(self):
+        try:
+            self.close()
+        except AttributeError:  # __init__ didn't finish
+            pass
+
+    def write(self, val):
+        if isinstance(val, DataPoint):
+            self.write_record(val)
+        elif val.startswith("*"):
+            self.start_segment(val[1:].strip())
+        elif ": " in val:
+            key, value = val.split(": ", 1)
+            self.meta[key] = value
+
+    def write_record(self, point: DataPoint):
+        if self.__closed:
+            return
+        if self.__file is None:
+            self.__file_open()
+        if len(self.segments) == 0:
+            self.start_segment("")
+        segment = self.segments[-1]
+        if segment["count"] == 0:
+            segment["start_time"] = point.timestamp
+        segment["end_time"] = point.timestamp
+        segment["count"] += 1
+        self.__file.write(
+            struct.pack("<dfff", point.timestamp, point.dec, point.a, point.b)
+        )
+        self.count += 1
+
+    def start_segment(self, label: str):
+        if len(self.segments) > 0 and self.segments[-1]["count"] == 0:
+            self.segments.pop()  # Nothing was written to the last one
+        self.segments.append(
+            {
+                "label": label,
+                "start": self.count,
+                "count": 0,
+                "start_time": None,
+                "end_time": None,
+            }
+        )
+
+    def close(self):
+        if self.__closed:
+            return
+        self.__closed = True
+        if self.__file is None:
+            return
+        if len(self.segments) > 0 and self.segments[-1]["count"] == 0:
+            self.segments.pop()
+
+        footer_offset = self.__file.tell()
+        self.__file.write(
+            json.dumps({"segments": self.segments, "meta": self.meta}).encode()
+        )
+        self.__file.seek(len(MAGIC))
+        self.__file.write(struct.pack("<QQ", self.count, footer_offset))
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__file.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    # HELPER FUNCTIONS
+
+    def __file_open(self):
+        if not os.path.isdir(self.dir):
+            os.mkdir(self.dir)
+        self.__file = open(
+            os.path.join(self.dir, self.filename), "wb", buffering=self.BUFFER_SIZE
+        )
+        self.__file.write(MAGIC.ljust(HEADER_SIZE, b"\0"))
+
+
+class MdBinary:
+    """
+    A binary observation file memory-mapped into numpy; 'records' and the column
+    arrays are views onto the file, so nothing is copied until it is used. The map
+    holds the file open (and, on Windows, locked) until close(), which a with
+    block does on leaving; copy anything that is still needed after that.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a binary observation file")
+
+        count, footer_offset = struct.unpack_from("<QQ", self.__map, len(MAGIC))
+        if footer_offset == 0:  # Never closed; recover what we can
+            count = (len(self.__map) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+            footer = {"segments": [], "meta": {}}
+        else:
+            footer = json.loads(bytes(self.__map[footer_offset:]))
+
+        self.records = np.frombuffer(
+            self.__map, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE
+        )
+        self.segments: list[dict] = footer["segments"]
+        self.meta: dict[str, str] = footer["meta"]
+
+    def __enter__(self) -> "MdBinary":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap the file; raises BufferError while views of it are still in use"""
+        self.records = np.empty(0, dtype=RECORD_DTYPE)
+        self.__map.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.__map.closed
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self.records["timestamp"]
+
+    @property
+    def dec(self) -> np.ndarray:
+        return self.records["dec"]
+
+    @property
+    def a(self) -> np.ndarray:
+        return self.records["a"]
+
+    @property
+    def b(self) -> np.ndarray:
+        return self.records["b"]
+
+    def segment(self, key: int | str) -> np.ndarray:
+        """Records of one segment, by index or by label (the first with that label)"""
+        if isinstance(key, str):
+            segment = next(s for s in self.segments if s["label"] == key)
+        else:
+            segment = self.segments[key]
+        return self.records[segment["start"]:segment["start"] + segment["count"]]
+
+    def sweeps(self) -> list[np.ndarray]:
+        """Records of each DATA segment, i.e. each sweep of a survey"""
+        return [
+            self.segment(i)
+            for i, s in enumerate(self.segments)
+            if s["label"] == "DATA"
+        ]
+
+
+def load_binary(path: str) -> MdBinary:
+    return MdBinary(path)
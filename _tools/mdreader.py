@@ -0,0 +1,152 @@
+"""
+Streaming reader for the .md1/.md2 text files written by Observation.
+
+Each file is one value per line: timestamp, dec and then either the one channel
+(_a and _b files) or both channels (_comp files) for every data point. Segments
+are separated by lines holding only '*', in the order CAL_1, BG_1, DATA, CAL_2,
+BG_2; a survey's DATA is further split into sweeps by more '*' lines. A finished
+file ends with two '*' lines followed by the metadata from write_meta.
+"""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from tools import load_index
+
+MARKER = "*"
+
+
+@dataclass(frozen=True)
+class SegmentChunk:
+    label: str  # CAL_1, BG_1, DATA, CAL_2 or BG_2
+    index: int  # Of the segment in the file; successive sweeps have successive ones
+    data: np.ndarray  # One row per data point: timestamp, dec, A and/or B
+
+
+def is_composite(path: str) -> bool:
+    return "_comp." in os.path.basename(path)
+
+
+def count_markers(path: str) -> int:
+    with open(path) as f:
+        return sum(1 for line in f if line.strip() == MARKER)
+
+
+def label_segment(index: int, markers: int, finished: bool) -> str:
+    """Label of the segment following 'index' markers, in a file with 'markers'
+    markers in total"""
+    if index == 0:
+        return "CAL_1"
+    if index == 1:
+        return "BG_1"
+    if finished and index == markers - 3:
+        return "CAL_2"
+    if finished and index == markers - 2:
+        return "BG_2"
+    return "DATA"
+
+
+def read_meta(path: str, tail: int = 4096) -> dict[str, str]:
+    """Metadata block at the end of a finished file, reading only the last bytes"""
+    with open(path, "rb") as f:
+        f.seek(max(0, os.path.getsize(path) - tail))
+        lines = f.read().decode(errors="replace").splitlines()
+    meta = {}
+    for line in reversed(lines):
+        if line.strip() == MARKER:
+            break
+        if ": " in line:
+            key, value = line.split(": ", 1)
+            meta[key] = value.strip()
+    return dict(reversed(meta.items()))
+
+
+def read_segments(path: str, chunk_size: int = 4096, composite: bool | None = None):
+    """
+    Yield SegmentChunks of at most 'chunk_size' data points each, in file order.
+    Memory use depends only on 'chunk_size', not on the size of the file. Files
+    that were never finished can be read too, but then any sweeps after BG_1 are
+    all labelled DATA.
+    """
+    if composite is None:
+        composite = is_composite(path)
+    columns = 4 if composite else 3
+
+    markers = count_markers(path)
+    finished = len(read_meta(path)) > 0
+    labels = [label_segment(i, markers, finished) for i in range(markers + 1)]
+
+    values: list[str] = []
+    index = 0
+
+    def chunk():
+        usable = len(values) - len(values) % columns  # Drop a torn last point
+        data = np.array(values[:usable], dtype=float).reshape(-1, columns)
+        values.clear()
+        return SegmentChunk(labels[index], index, data)
+
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line == "":
+                continue
+            if line == MARKER:
+                if len(values) > 0:
+                    yield chunk()
+                index += 1
+                if finished and index == markers - 1:
+                    return  # Only metadata is left
+                continue
+            values.append(line)
+            if len(values) == chunk_size * columns:
+                yield chunk()
+    if len(values) > 0 and not finished:
+        yield chunk()
+
+
+def read_segment(path: str, label: str, composite: bool | None = None) -> np.ndarray:
+    """All data points of the segments with one label, e.g. every sweep for DATA"""
+    if composite is None:
+        composite = is_composite(path)
+    chunks = [
+        c.data
+        for c in read_segments(path, composite=composite)
+        if c.label == label
+    ]
+    if len(chunks) == 0:
+        return np.empty((0, 4 if composite else 3))
+    return np.concatenate(chunks)
+
+
+def index_path(path: str) -> str:
+    """Sidecar index written alongside a data file, e.g. name.idx for name_a.md2"""
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, filename.rsplit("_", 1)[0] + ".idx")
+
+
+def find_segments(
+    path: str, label: str | None = None, sweep: int | None = None
+) -> list[dict]:
+    """Index entries of a data file's segments, optionally only those with a given
+    label and/or sweep number"""
+    return [
+        entry
+        for entry in load_index(index_path(path))
+        if (label is None or entry["label"] == label)
+        and (sweep is None or entry["sweep"] == sweep)
+    ]
+
+
+def read_indexed_segment(
+    path: str, entry: dict, composite: bool | None = None
+) -> np.ndarray:
+    """Read just the segment described by an index entry, seeking straight to it"""
+    if composite is None:
+        composite = is_composite(path)
+    start, end = entry["offsets"][os.path.basename(path)]
+    with open(path, "rb") as f:
+        f.seek(start)
+        values = f.read(end - start).split()
+    return np.array(values, dtype=float).reshape(-1, 4 if composite else 3)
@@ -27,6 +27,9 @@ class MiniTars:
         self.parent = parent
         self.testing = True
         self.acquiring = False
+        # Simulated declination, set from the testing frame on the GUI thread
+        self.dec_auto = True
+        self.dec = 0.0
         if device is not None:
             self.testing = False
             self.ser = MySerial(device)
@@ -102,7 +105,7 @@ class MiniTars:
     # Testing
 
     def random_data(self) -> float:
-        """For testing"""
-        if self.parent.ui.dec_auto_check_box.isChecked():
+        """For testing; sweeps back and forth unless the testing frame says otherwise"""
+        if self.dec_auto:
             return math.sin(time.time() / 2) * 100
-        return float(self.parent.ui.declination_slider.value())
+        return float(self.dec)
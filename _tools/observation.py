@@ -2,7 +2,9 @@ import time
 from enum import Enum
 from math import floor
 
-from tools import Comm, DataPoint, ObsRecord
+from tools import Comm, DataPoint, MyPrecious, ObsRecord, Integrator, Decimator
+from tools import AsyncWriter, BinaryPrecious, SegmentIndex, SuperClock
+from tools import TIME, DEC, A, B
 
 
 class ObsType(Enum):
@@ -57,6 +59,9 @@ class Observation:
         # Will be set accordingly in each state.
         self.freq = self.cal_freq
 
+        # Length of the anti-aliasing filter, in output sampling periods
+        self.filter_span = 8
+
         self.state = State.OFF
 
         self.state_time_interval: tuple = (-1.0, -1.0)
@@ -76,10 +81,28 @@ class Observation:
         self.file_a = None
         self.file_b = None
         self.file_comp = None
+        self.file_stats = None
+        self.file_bin = None
+        self.file_index = None
+        self.index: SegmentIndex | None = None
+        self.file_extension = ".md1"
+        self.binary = False  # Also write the compact binary format
+        self.raw_capture = False  # Also keep every sample at the full device rate
+        self.writer: AsyncWriter | None = None  # Write files on a separate thread
+
+        # Average every sample between two writes rather than writing the latest
+        self.integrator: Integrator | None = None
+
+        # Or low-pass filter and decimate to exactly 'freq' (takes precedence)
+        self.decimator: Decimator | None = None
+        self.filtered: list[DataPoint] = []  # Filter output awaiting a write
 
         # Record keeping for later display/testing
         self.input_record: ObsRecord | None = None
 
+        # Source of the current time; the system clock until one is set
+        self.clock: SuperClock | None = None
+
         # Temporary bookkeeping
         self.cal_start = None
         self.bg_start = None
@@ -116,8 +139,59 @@ class Observation:
     def set_input_record(self, input_record: ObsRecord):
         self.input_record = input_record
 
+    def set_clock(self, clock: SuperClock):
+        """Take every state time from 'clock' rather than the system clock"""
+        self.clock = clock
+
+    def now(self) -> float:
+        return self.clock.get_time() if self.clock is not None else time.time()
+
+    def set_raw_capture(self, raw_capture: bool):
+        self.raw_capture = raw_capture
+
+    def set_binary(self, binary: bool):
+        """Write a binary .mdb1/.mdb2 file alongside the text files; takes effect
+        when the name is set"""
+        self.binary = binary
+
+    def set_async_writes(self, async_writes: bool):
+        """Hand all file writes to a writer thread, started on the first write"""
+        self.writer = AsyncWriter() if async_writes else None
+
+    def set_integration(self, integrate: bool, stats: bool = False):
+        """Write the boxcar mean of all samples since the previous write; with stats,
+        also write the min, max and standard deviation of A and B to a '_stats'
+        file"""
+        self.integrator = Integrator(stats) if integrate else None
+
+    def set_decimation(self, sample_rate: float | None):
+        """Write samples low-pass filtered and decimated from 'sample_rate' (Hz) down
+        to the current sampling frequency; None turns filtering off"""
+        if sample_rate is None:
+            self.decimator = None
+        else:
+            self.decimator = Decimator(sample_rate, self.freq, self.filter_span)
+
+    # Sample API
+    def accumulate(self, rows):
+        """Feed every new sample (rows as published by SampleRing) to the observation"""
+        if self.decimator is not None:
+            self.decimator.set_output_rate(self.freq)
+            output = self.decimator.process(rows[:, [TIME, DEC, A, B]])
+            self.filtered.extend(DataPoint(*row) for row in output)
+        elif self.integrator is not None:
+            self.integrator.add_block(
+                rows[:, TIME], rows[:, DEC], rows[:, A], rows[:, B]
+            )
+
     # Communication API
     def communicate(self, data_point, timestamp: float) -> Comm:
+        comm = self._communicate(data_point, timestamp)
+        self.discard_samples()  # Each sample is only ever written once
+        self.flush_files(if_due=True)  # Even in states that write nothing
+        return comm
+
+    def _communicate(self, data_point, timestamp: float) -> Comm:
         # assert self.start_time
         # assert self.end_time
         # assert self.cal_start
@@ -178,6 +252,8 @@ class Observation:
 
     # This is the action API
     def next(self, override=None):
+        self.discard_samples()  # Don't carry samples into the next state
+        self.reset_filter()
         if override is not None:
             self.state = override
         else:
@@ -201,15 +277,19 @@ class Observation:
 
     def start_calibration_1(self):
         self.state = State.CAL_1
-        self.start_time = time.time()
-        self.cal_start = time.time()
+        self.start_time = self.now()
+        self.cal_start = self.start_time
         self.freq = self.cal_freq
         self.state_time_interval = (self.cal_start, self.cal_start + self.cal_dur)
+        if self.index is not None:
+            self.index.start_segment(self.state.name)
+        if self.file_bin is not None:
+            self.output(self.file_bin, "* " + self.state.name)
 
     def end_calibration_1(self):
         self.state = State.BG_1
         self.write("*")
-        self.bg_start = time.time()
+        self.bg_start = self.now()
         self.state_time_interval = (self.bg_start, self.bg_start + self.bg_dur)
 
     def end_background_1(self):
@@ -224,31 +304,48 @@ class Observation:
     def start_calibration_2(self):
         self.state = State.CAL_2
         self.write("*")
-        self.cal_start = time.time()
+        self.cal_start = self.now()
         self.freq = self.cal_freq
         self.state_time_interval = (self.cal_start, self.cal_start + self.cal_dur)
 
     def end_calibration_2(self):
         self.state = State.BG_2
         self.write("*")
-        self.bg_start = time.time()
+        self.bg_start = self.now()
         self.state_time_interval = (self.bg_start, self.bg_start + self.bg_dur)
 
     def stop(self):
         self.state = State.DONE
-        self.end_time = time.time()
+        self.end_time = self.now()
         self.state_time_interval = (-1.0, self.end_time)
         self.write("*")
         self.write("*")
         self.write_meta()
         self.close_file()
 
-    # To be implemented in each subclass
     def set_files(self):
         """This function generates appropriate file types (.md1 or .md2) based on
-        observation type."""
-        pass
+        observation type. Only the files needed by 'composite' are set up, and none
+        is created on disk until something is written to it."""
+        assert self.name
+        if self.composite:
+            self.file_comp = MyPrecious(self.name + "_comp" + self.file_extension)
+            self.file_a = None
+            self.file_b = None
+        else:
+            self.file_a = MyPrecious(self.name + "_a" + self.file_extension)
+            self.file_b = MyPrecious(self.name + "_b" + self.file_extension)
+            self.file_comp = None
+        if self.binary:
+            self.file_bin = BinaryPrecious(
+                self.name + self.file_extension.replace("md", "mdb")
+            )
+
+        # Sidecar index of the segments in the data files
+        self.file_index = MyPrecious(self.name + ".idx")
+        self.index = SegmentIndex([f.filename for f in self.get_data_files()])
 
+    # To be implemented in each subclass
     def data_logic(self, data_point) -> Comm:
         """
         This function defines the behavior of observation during the main data
@@ -260,29 +357,90 @@ class Observation:
 
     # Helpers
 
-    def write(self, string: str):
-        assert self.file_comp
-        assert self.file_a
-        assert self.file_b
+    def write(self, string: str, point: bool = False):
+        """Write to every file; 'point' values (parts of a data point) only go to
+        the text data files"""
+        if string == "*" and self.index is not None:
+            entry = self.index.end_segment()
+            if entry is not None:
+                self.output(self.file_index, entry)
         if self.composite:
-            self.file_comp.write(string)
+            assert self.file_comp
+            self.output_data(self.file_comp, string)
         else:
-            self.file_a.write(string)
-            self.file_b.write(string)
+            assert self.file_a
+            assert self.file_b
+            self.output_data(self.file_a, string)
+            self.output_data(self.file_b, string)
+        if string == "*" and self.index is not None:
+            self.index.start_segment(self.state.name)
+        if point:
+            return
+        if self.file_stats is not None:
+            self.output(self.file_stats, string)
+        if self.file_bin is not None:
+            # Label segments with the state they hold
+            label = string + " " + self.state.name if string == "*" else string
+            self.output(self.file_bin, label)
 
     def write_data(self, point: DataPoint):
+        """Write the filter output or integrated samples if there are any, otherwise
+        the given point"""
+        if self.decimator is not None:
+            for filtered_point in self.filtered:
+                self.write_point(filtered_point)
+            self.filtered = []
+            return
+        if self.integrator is not None and self.integrator.count > 0:
+            if self.integrator.stats:
+                self.write_stats(self.integrator)
+            point = self.integrator.mean()
+        self.write_point(point)
+
+    def write_point(self, point: DataPoint):
         # print(f"{point.timestamp}, dec: {point.dec}")
-        self.write("%.2f" % point.timestamp)
-        self.write("%.4f" % point.dec)
-        assert self.file_comp
-        assert self.file_a
-        assert self.file_b
+        if self.index is not None:
+            if self.index.segment is None:
+                self.index.start_segment(self.state.name)
+            sweep = self.sweep_number if self.state == State.DATA else -1
+            self.index.add_point(point.timestamp, sweep)
+        self.write("%.2f" % point.timestamp, point=True)
+        self.write("%.4f" % point.dec, point=True)
         if self.composite:
-            self.file_comp.write("%.4f" % point.a)
-            self.file_comp.write("%.4f" % point.b)
+            self.output_data(self.file_comp, "%.4f" % point.a)
+            self.output_data(self.file_comp, "%.4f" % point.b)
         else:
-            self.file_a.write("%.4f" % point.a)
-            self.file_b.write("%.4f" % point.b)
+            self.output_data(self.file_a, "%.4f" % point.a)
+            self.output_data(self.file_b, "%.4f" % point.b)
+        if self.file_bin is not None:
+            self.output(self.file_bin, point)
+
+    def discard_samples(self):
+        self.filtered = []
+        if self.integrator is not None:
+            self.integrator.reset()
+
+    def reset_filter(self):
+        """Keep the decimating filter from smearing samples from before a change
+        (of state, of frequency) into the ones after it"""
+        if self.decimator is not None:
+            self.decimator.reset()
+
+    def write_stats(self, integrator: Integrator):
+        if self.file_stats is None:
+            self.file_stats = MyPrecious(self.name + "_stats" + self.file_extension)
+        std_a, std_b = integrator.std()
+        for val in [
+            "%.2f" % (integrator.sum_time / integrator.count),
+            integrator.count,
+            "%.4f" % integrator.min_a,
+            "%.4f" % integrator.max_a,
+            "%.4f" % std_a,
+            "%.4f" % integrator.min_b,
+            "%.4f" % integrator.max_b,
+            "%.4f" % std_b,
+        ]:
+            self.output(self.file_stats, val)
 
     def write_meta(self):
         self.write("TELESCOPE: The Mighty Forty")
@@ -291,15 +449,60 @@ class Observation:
         self.write("LOCAL STOP DATE: " + get_date(self.end_time))
         self.write("LOCAL STOP TIME: " + get_time(self.end_time))
 
+    def get_data_files(self) -> list[MyPrecious]:
+        files = [self.file_comp] if self.composite else [self.file_a, self.file_b]
+        return [f for f in files if f is not None]
+
+    def get_text_files(self) -> list[MyPrecious]:
+        files = self.get_data_files()
+        if self.file_index is not None:
+            files.append(self.file_index)
+        if self.file_stats is not None:
+            files.append(self.file_stats)
+        return files
+
+    def flush_files(self, if_due: bool = False):
+        """Flush the text files, or with 'if_due' those whose values have waited
+        their 'flush_seconds'; MyPrecious only checks when a value is written"""
+        files = self.get_text_files()
+        if self.writer is not None:
+            if self.writer.ident is not None:  # Otherwise nothing is written yet
+                self.writer.flush_files(*files, if_due=if_due)
+        else:
+            for file in files:
+                if if_due:
+                    file.flush_if_due()
+                else:
+                    file.flush()
+
     def close_file(self):
-        assert self.file_comp
-        assert self.file_a
-        assert self.file_b
-        if self.composite:
-            self.file_comp.close()
+        files = self.get_text_files()
+        if self.file_bin is not None:
+            files.append(self.file_bin)
+
+        if self.writer is not None:
+            # Let the writer finish everything queued before returning
+            self.writer.close_files(*files)
+            self.writer.stop()
         else:
-            self.file_a.close()
-            self.file_b.close()
+            for file in files:
+                file.close()
+
+    def output(self, file: MyPrecious, line):
+        """Write a line to one of the files, through the writer thread if there is
+        one"""
+        if self.writer is not None:
+            if self.writer.ident is None:
+                self.writer.start()
+            self.writer.write(file, line)
+        else:
+            file.write(line)
+
+    def output_data(self, file: MyPrecious, line):
+        """Write a line to a text data file, keeping track of where it ends up"""
+        if self.index is not None:
+            self.index.count(file.filename, line)
+        self.output(file, line)
 
 
 def get_date(epoch_time) -> str:
@@ -3,73 +3,124 @@ Functionalities needed for working with files.
 """
 
 import os
+import time
 
 
 class MyPrecious:
-    MAX_BUFFER_SIZE = 0
-
-    def __init__(self, filename: str):
+    """
+    Text file written one value per line through a single open handle. Nothing
+    touches the disk until the first value is flushed, so a file that is never
+    written to is never created. Values are buffered and handed to the OS in
+    batches, whenever the buffer reaches 'flush_count' values or 'flush_bytes'
+    bytes, or a write comes in more than 'flush_seconds' after the last flush; when
+    writes stop, flush_if_due() on a timer keeps values from waiting any longer. In
+    durable mode the file is also fsynced at every segment boundary ('*') and on
+    close().
+    """
+
+    FLUSH_COUNT = 256  # values
+    FLUSH_BYTES = 64 * 1024  # bytes
+    FLUSH_SECONDS = 1.0  # s
+    SEGMENT_MARKER = "*"
+
+    def __init__(
+        self,
+        filename: str,
+        directory: str = "./data/",
+        flush_count: int = FLUSH_COUNT,
+        flush_bytes: int = FLUSH_BYTES,
+        flush_seconds: float = FLUSH_SECONDS,
+        durable: bool = True,
+    ):
         self.filename = filename
-        self.__buffer = []
+        self.flush_count = flush_count
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.durable = durable
 
-        self.dir = "./data/"
-        if not os.path.isdir(self.dir):
-            os.mkdir(self.dir)
+        self.__buffer: list[str] = []
+        self.__buffer_bytes = 0
+        self.__last_flush = time.monotonic()
 
-        self.__file_clear()
+        self.dir = directory
+        self.__file = None  # Opened on first flush
+        self.__closed = False
 
     def __del__(self):
-        if self.__buffer_size() > 0:
-            self.__buffer_write()
+        try:
+            self.close()
+        except AttributeError:  # __init__ didn't finish
+            pass
 
     def write(self, val):
-        self.__buffer_append(str(val))
-        if self.__buffer_size() > MyPrecious.MAX_BUFFER_SIZE:
-            self.__buffer_write()
+        line = str(val)
+        self.__buffer.append(line)
+        self.__buffer_bytes += len(line) + 1
+
+        if line == MyPrecious.SEGMENT_MARKER and self.durable:
+            self.sync()
+        elif (
+            len(self.__buffer) >= self.flush_count
+            or self.__buffer_bytes >= self.flush_bytes
+            or time.monotonic() - self.__last_flush >= self.flush_seconds
+        ):
+            self.flush()
 
     def clear(self):
-        self.__buffer_clear()
+        """Drop everything that hasn't been flushed yet"""
+        self.__buffer = []
+        self.__buffer_bytes = 0
+
+    def flush(self):
+        """Hand everything buffered to the OS"""
+        if self.__closed:
+            return
+        if len(self.__buffer) > 0:
+            if self.__file is None:
+                self.__file_open()
+            self.__file.write("\n".join(self.__buffer) + "\n")
+            self.clear()
+        if self.__file is not None:
+            self.__file.flush()
+        self.__last_flush = time.monotonic()
+
+    def flush_if_due(self):
+        """Flush if values have been waiting since more than 'flush_seconds' after
+        the last flush"""
+        due = time.monotonic() - self.__last_flush >= self.flush_seconds
+        if due and len(self.__buffer) > 0:
+            self.flush()
+
+    def sync(self):
+        """Flush and make sure it has actually reached the disk"""
+        self.flush()
+        if self.__file is not None and not self.__closed:
+            os.fsync(self.__file.fileno())
 
     def close(self):
-        self.__buffer_write()
+        if self.__closed:
+            return
+        if self.durable:
+            self.sync()
+        else:
+            self.flush()
+        if self.__file is not None:
+            self.__file.close()
+        self.__closed = True
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    @property
+    def created(self) -> bool:
+        """Whether the file exists on disk yet"""
+        return self.__file is not None
 
     # HELPER FUNCTIONS
 
-    def __buffer_clear(self):
-        """
-        Run this function at the beginning, or each time when the buffer needs to be resetted.
-        """
-        self.__buffer = []
-
-    def __buffer_write(self):
-        """
-        Run this function to actually write to the file. It will automatically clear the buffer
-        """
-        self.__file_append("\n".join(self.__buffer))
-        self.__buffer_clear()
-
-    def __buffer_append(self, data: str):
-        self.__buffer.append(data)
-
-    def __buffer_size(self) -> int:
-        return len(self.__buffer)
-
-    def __file_write(self, data, mode="a"):
-        if mode != "a" and mode != "w":
-            print(
-                "Write mode not recognized. Please use "
-                + "'a' for append and 'w' for write (overwrite)."
-            )
-        with open(self.dir + self.filename, mode) as file:
-            # noinspection PyTypeChecker
-            print(data, end="\n", file=file)
-
-    def __file_overwrite(self, data):
-        self.__file_write(data, mode="w")
-
-    def __file_append(self, data):
-        self.__file_write(data, mode="a")
-
-    def __file_clear(self):
-        with open(self.dir + self.filename, "w") as file:
-            print("", end="", file=file)
+    def __file_open(self):
+        if not os.path.isdir(self.dir):
+            os.mkdir(self.dir)
+        # '\n' line endings on every platform, so SegmentIndex's byte offsets hold
+        self.__file = open(os.path.join(self.dir, self.filename), "w", newline="\n")
@@ -0,0 +1,105 @@
+"""
+Latency histograms for the stages of the main loop.
+"""
+
+import math
+import time
+from functools import wraps
+
+
+class Histogram:
+    """
+    Fixed-memory histogram of durations, in buckets spaced logarithmically from
+    FLOOR (anything faster lands in the first bucket) to FLOOR * 10**DECADES, so
+    percentiles are accurate to within one bucket, about 12%. The maximum is exact.
+    """
+
+    FLOOR = 1e-6  # s
+    DECADES = 7
+    PER_DECADE = 20
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.counts = [0] * (Histogram.DECADES * Histogram.PER_DECADE + 1)
+        self.count = 0
+        self.total = 0.0  # s
+        self.max = 0.0  # s
+
+    def add(self, seconds: float):
+        if seconds > Histogram.FLOOR:
+            bucket = int(math.log10(seconds / Histogram.FLOOR) * Histogram.PER_DECADE)
+            bucket = min(bucket, len(self.counts) - 1)
+        else:
+            bucket = 0
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        """Upper edge of the bucket holding the given percentile, in seconds"""
+        if self.count == 0:
+            return 0.0
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                edge = Histogram.FLOOR * 10 ** ((bucket + 1) / Histogram.PER_DECADE)
+                return min(edge, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+
+class Profiler:
+    """
+    Times named stages with wrap(), one Histogram each. A disabled profiler hands
+    back the functions it is given untouched, so it costs nothing at all.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: dict[str, Histogram] = {}
+
+    def wrap(self, name: str, function):
+        """'function', timed into the histogram 'name' on every call"""
+        if not self.enabled:
+            return function
+        histogram = self.stages.setdefault(name, Histogram())
+
+        @wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add(time.perf_counter() - start)
+
+        return timed
+
+    def reset(self):
+        for histogram in self.stages.values():
+            histogram.clear()
+
+    def get_report(self) -> str:
+        """Table of call counts and p50/p95/p99/max latency (ms) for every stage"""
+        width = max((len(name) for name in self.stages), default=5)
+        lines = [
+            f"{'stage':<{width}} {'calls':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+            f"{'max':>8}"
+        ]
+        for name, histogram in self.stages.items():
+            values = [histogram.percentile(p) for p in (50, 95, 99)] + [histogram.max]
+            lines.append(
+                f"{name:<{width}} {histogram.count:>8} "
+                + " ".join(f"{1000 * value:>8.3f}" for value in values)
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.get_report() + "\n")
@@ -0,0 +1,77 @@
+"""
+Optional full-rate capture of every sample published by the acquisition thread, for
+reprocessing observations at any cadence after the fact.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from .samplering import SampleRing, TIME, RAW_DEC, DEC, A, B
+
+MAGIC = b"3PIORAW1"
+RAW_DTYPE = np.dtype(
+    [
+        ("timestamp", "<f8"),  # Sidereal seconds
+        ("raw_dec", "<f4"),
+        ("dec", "<f4"),
+        ("a", "<f4"),
+        ("b", "<f4"),
+    ]
+)
+
+
+class RawCapture(threading.Thread):
+    """
+    Subscribes to a SampleRing and appends every new sample to a binary file of
+    RAW_DTYPE records, preceded by MAGIC. All disk access happens on this thread;
+    call stop() to flush the last samples and close the file.
+    """
+
+    WRITE_PERIOD = 0.5  # s
+
+    def __init__(self, filename: str, ring: SampleRing, directory: str = "./data/"):
+        super().__init__(name="raw capture", daemon=True)
+        self.samples = ring.subscribe()  # Only capture from now on
+        self.samples_written = 0
+
+        if not os.path.isdir(directory):
+            os.mkdir(directory)
+        self.path = os.path.join(directory, filename)
+        self.file = open(self.path, "wb")
+        self.file.write(MAGIC)
+
+        self.__stopped = threading.Event()
+
+    def run(self):
+        while not self.__stopped.wait(self.WRITE_PERIOD):
+            self.write_pending()
+        self.write_pending()
+        self.file.close()
+
+    def stop(self):
+        self.__stopped.set()
+        if self.is_alive():
+            self.join()
+        elif not self.file.closed:  # Never started
+            self.write_pending()
+            self.file.close()
+
+    def write_pending(self):
+        rows = self.samples.poll()
+        if len(rows) == 0:
+            return
+        records = np.empty(len(rows), dtype=RAW_DTYPE)
+        for name, column in zip(RAW_DTYPE.names, (TIME, RAW_DEC, DEC, A, B)):
+            records[name] = rows[:, column]
+        self.file.write(records.tobytes())
+        self.samples_written += len(records)
+
+
+def load_raw_capture(path: str) -> np.ndarray:
+    """Read a raw capture file back as a structured array of RAW_DTYPE"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a raw capture file")
+    return np.fromfile(path, dtype=RAW_DTYPE, offset=len(MAGIC))
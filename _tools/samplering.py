@@ -0,0 +1,132 @@
+"""
+Fixed-capacity ring buffer of timestamped samples, shared between the acquisition
+thread (the only writer) and any number of readers.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+# Columns of each sample row
+TIME = 0  # Sidereal seconds
+RAW_DEC = 1  # Straight from the declinometer
+DEC = 2  # Calibrated
+A = 3
+B = 4
+COLUMNS = 5
+
+
+class SampleRing:
+    """
+    Single-producer ring buffer. The producer writes rows and only then advances
+    'head', the total number of rows ever written, so readers never need a lock:
+    each reader keeps its own cursor (a previous value of 'head') and copies out
+    the rows between it and the current head. If a reader falls more than
+    'capacity' rows behind, the oldest rows are lost and it skips ahead. Before
+    writing, the producer sets 'writing' to what 'head' will be once it's done, so
+    a reader can tell afterwards which of the rows it copied may have been
+    overwritten under it.
+
+    Since memory is fixed at 'capacity' rows, the ring also serves as the store of
+    recent samples: last() and since() copy out windows of it as one array.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, COLUMNS))
+        self.head = 0
+        self.writing = 0  # 'head' once the push in progress is published
+
+    def push(self, rows: np.ndarray):
+        """Append rows; must only ever be called from one thread"""
+        end = self.head + len(rows)  # Rows that don't fit still count as written
+        rows = rows[-self.capacity:]
+        self.writing = end
+        start = (end - len(rows)) % self.capacity
+        first = min(len(rows), self.capacity - start)
+        self.buffer[start:start + first] = rows[:first]
+        self.buffer[:len(rows) - first] = rows[first:]
+        self.head = end  # Publish
+
+    def read_since(self, cursor: int) -> tuple[np.ndarray, int]:
+        """Copy out every row written after 'cursor'; returns the rows and new cursor"""
+        head = self.head
+        cursor = max(cursor, head - self.capacity)
+        rows = self.__copy(cursor, head)
+
+        # The producer may have lapped us, or started to, while we were copying
+        overwritten = self.writing - self.capacity - cursor
+        if overwritten > 0:
+            rows = rows[overwritten:]
+        return rows, head
+
+    def subscribe(self, from_start: bool = False) -> "Subscription":
+        """New reader that receives every row written from now on (or, with
+        'from_start', every row still held)"""
+        return Subscription(self, self.oldest if from_start else self.head)
+
+    def __len__(self) -> int:
+        """Number of rows currently held"""
+        return min(self.head, self.capacity)
+
+    @property
+    def oldest(self) -> int:
+        """Cursor of the oldest row still held"""
+        return max(0, self.head - self.capacity)
+
+    def last(self, count: int) -> np.ndarray:
+        """Copy of the most recent 'count' rows (fewer if not that many are held)"""
+        rows, _ = self.read_since(self.head - max(count, 0))
+        return rows
+
+    def since(self, timestamp: float) -> np.ndarray:
+        """Copy of every held row stamped at or after 'timestamp'"""
+        held = range(self.oldest, self.head)
+        cursor = bisect_left(
+            held, timestamp, key=lambda i: self.buffer[i % self.capacity, TIME]
+        )
+        rows, _ = self.read_since(held.start + cursor)
+        return rows
+
+    def latest(self) -> np.ndarray | None:
+        """Copy of the most recent row, or None if nothing has been written"""
+        if self.head == 0:
+            return None
+        rows, _ = self.read_since(self.head - 1)
+        return rows[-1] if len(rows) > 0 else None
+
+    def __copy(self, start: int, end: int) -> np.ndarray:
+        first = start % self.capacity
+        count = end - start
+        if first + count <= self.capacity:
+            return self.buffer[first:first + count].copy()
+        return np.concatenate(
+            (self.buffer[first:], self.buffer[:first + count - self.capacity])
+        )
+
+
+class Subscription:
+    """
+    One consumer's cursor into a SampleRing. Rows are numbered by the order they
+    were written in, so 'cursor' is the sequence number of the next row to be
+    received; each poll() returns exactly the rows written since the last, in one
+    batch. A consumer that falls more than the ring's capacity behind loses the
+    oldest rows, which are counted in 'dropped', without holding up anyone else.
+    """
+
+    def __init__(self, ring: SampleRing, cursor: int):
+        self.ring = ring
+        self.cursor = cursor
+        self.dropped = 0
+
+    def poll(self) -> np.ndarray:
+        """Every row written since the last poll, oldest first"""
+        rows, head = self.ring.read_since(self.cursor)
+        self.dropped += head - self.cursor - len(rows)
+        self.cursor = head
+        return rows
+
+    @property
+    def pending(self) -> int:
+        """Number of rows waiting to be polled"""
+        return self.ring.head - self.cursor
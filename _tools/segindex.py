@@ -0,0 +1,57 @@
+"""
+Sidecar index of where each segment of an observation's text files starts and ends.
+"""
+
+import json
+
+
+class SegmentIndex:
+    """
+    Follows every line written to the .md1/.md2 data files so that it always knows
+    their byte offsets, and turns each finished segment into one JSON line:
+        label       CAL_1, BG_1, DATA, CAL_2 or BG_2
+        sweep       sweep number for a survey's DATA segments, otherwise -1
+        points      number of data points
+        start_time  timestamp of the first point
+        end_time    timestamp of the last point
+        offsets     {filename: [start, end]}, byte range of the segment's values
+    """
+
+    def __init__(self, filenames: list[str]):
+        self.offsets = {filename: 0 for filename in filenames}
+        self.segment: dict | None = None
+
+    def count(self, filename: str, line):
+        self.offsets[filename] += len(str(line).encode()) + 1
+
+    def start_segment(self, label: str):
+        self.segment = {
+            "label": label,
+            "sweep": -1,
+            "points": 0,
+            "start_time": None,
+            "end_time": None,
+            "offsets": {name: [start, start] for name, start in self.offsets.items()},
+        }
+
+    def add_point(self, timestamp: float, sweep: int = -1):
+        assert self.segment is not None
+        if self.segment["points"] == 0:
+            self.segment["sweep"] = sweep
+            self.segment["start_time"] = timestamp
+        self.segment["end_time"] = timestamp
+        self.segment["points"] += 1
+
+    def end_segment(self) -> str | None:
+        """Finish the current segment; returns its index line unless it was empty"""
+        segment, self.segment = self.segment, None
+        if segment is None or segment["points"] == 0:
+            return None
+        for name, offset in self.offsets.items():
+            segment["offsets"][name][1] = offset
+        return json.dumps(segment)
+
+
+def load_index(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip() != ""]
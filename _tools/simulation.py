@@ -0,0 +1,161 @@
+"""
+Runs whole observations against a simulated telescope in virtual time, so that the
+full pipeline can be exercised in seconds instead of nights.
+"""
+
+import numpy as np
+
+from tools import Comm, DataPoint, Observation, ObsType, Tars, VirtualClock
+
+from .samplering import TIME, RAW_DEC, DEC, A, B, COLUMNS
+
+
+class SimulatedTelescope:
+    """
+    Stands in for Tars and MiniTars: a receiver looking at a patch of sky with one
+    source in it, plus noise, and a declinometer that follows the telescope as the
+    operator slews it north or south. The calibration switches add a fixed step to
+    both channels.
+    """
+
+    SLEW_RATE = 0.5  # degrees/s
+    SOURCE_RA = 6 * 3600.0  # sidereal seconds
+    SOURCE_DEC = 20.0  # degrees
+    SOURCE_WIDTH = 1.0  # degrees
+    CAL_STEP = 0.5  # V
+    NOISE = 0.01  # V
+
+    def __init__(self, dec: float = SOURCE_DEC, seed: int | None = None):
+        self.dec = dec
+        self.direction = 0  # 1 = north, -1 = south
+        self.calibrating = False
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, times: np.ndarray, sample_period: float) -> np.ndarray:
+        """Rows as the acquisition thread would publish them, for each sidereal time
+        in 'times', 'sample_period' (solar) seconds apart"""
+        steps = np.arange(1, len(times) + 1)
+        decs = self.dec + self.direction * self.SLEW_RATE * sample_period * steps
+        if len(decs) > 0:
+            self.dec = decs[-1]
+
+        # Angular distance from the source, in degrees
+        ra_offset = (times - self.SOURCE_RA + 43200) % 86400 - 43200
+        distance = np.hypot(ra_offset / 240, decs - self.SOURCE_DEC)
+        signal = np.exp(-0.5 * (distance / self.SOURCE_WIDTH) ** 2)
+        cal = self.CAL_STEP if self.calibrating else 0.0
+
+        rows = np.empty((len(times), COLUMNS))
+        rows[:, TIME] = times
+        rows[:, RAW_DEC] = decs
+        rows[:, DEC] = decs
+        for channel, gain in ((A, 1.0), (B, 0.8)):
+            noise = self.rng.normal(0, self.NOISE, len(times))
+            rows[:, channel] = 1 + gain * signal + cal + noise
+        return rows
+
+
+class Simulation:
+    """
+    Drives an Observation from OFF to DONE the way Threepio does, with every alert
+    acknowledged at once and the telescope slewed as soon as it is asked to be.
+    Time is a VirtualClock that jumps straight to each data update, so a night's
+    observation takes seconds. Every transmission other than NO_ACTION is kept in
+    'events' along with the (epoch) time it was received.
+    """
+
+    def __init__(
+        self,
+        obs: Observation,
+        clock: VirtualClock,
+        telescope: SimulatedTelescope | None = None,
+        sample_rate: float = Tars.SAMPLE_RATE,
+    ):
+        self.obs = obs
+        self.clock = clock
+        self.sample_rate = sample_rate
+        if telescope is None:
+            telescope = SimulatedTelescope(dec=self.starting_dec(obs))
+        self.telescope = telescope
+
+        self.obs.set_clock(clock)
+        self.data_timer = clock.add_timer(
+            1000 / obs.freq, self.update_data, name="update_data"
+        )
+        self.last_sample_time = clock.get_time()
+        self.data_point: DataPoint | None = None
+        self.previous_transmission: Comm | None = None
+        self.events: list[tuple[float, Comm]] = []
+        self.samples = 0
+        self.finished = False
+
+    @staticmethod
+    def starting_dec(obs: Observation) -> float:
+        """Where the telescope is pointing to begin with: at the observation's dec,
+        or just south of a survey's range so that its first sweep goes north"""
+        dec = SimulatedTelescope.SOURCE_DEC if obs.min_dec is None else obs.min_dec
+        return dec - 1 if obs.obs_type is ObsType.SURVEY else dec
+
+    def run(self, limit: float = 7 * 86400) -> list[tuple[float, Comm]]:
+        """Run until the observation is finished, or 'limit' seconds of virtual time
+        have passed; returns the events"""
+        end = self.clock.get_time() + limit
+        while not self.finished and self.clock.get_time() < end:
+            due = self.clock.next_due()
+            if due is None:
+                break
+            self.clock.advance(due)
+            self.acquire()
+            self.clock.run_timers()
+        return self.events
+
+    def acquire(self):
+        """Publish every sample the telescope took since the last call"""
+        period = 1 / self.sample_rate
+        now = self.clock.get_time()
+        count = int((now - self.last_sample_time) / period)
+        if count == 0:
+            return
+        self.last_sample_time += count * period
+
+        # Sidereal timestamps, counting back from the latest sample
+        ages = now - self.last_sample_time + period * np.arange(count)[::-1]
+        times = self.clock.get_sidereal_seconds() - self.clock.solar_to_sidereal(ages)
+        rows = self.telescope.sample(times, period)
+
+        self.obs.accumulate(rows)
+        self.data_point = DataPoint(*rows[-1, [TIME, DEC, A, B]])
+        self.samples += count
+
+    def update_data(self):
+        """Threepio.update_data with an operator who does everything immediately"""
+        self.data_timer.set_period(1000 / self.obs.freq)
+        if self.data_point is None:
+            return
+
+        transmission = self.obs.communicate(self.data_point, self.clock.get_time())
+        if transmission is not Comm.NO_ACTION:
+            self.events.append((self.clock.get_time(), transmission))
+
+        if transmission != self.previous_transmission:
+            if transmission is Comm.START_CAL:
+                self.telescope.direction = 0  # "STOP the telescope"
+                self.telescope.calibrating = True
+                self.clock.reset_anchor_time()
+                self.obs.next()
+            elif transmission is Comm.START_BG:
+                self.telescope.calibrating = False
+                self.clock.reset_anchor_time()
+                self.obs.next()
+
+        if transmission in [Comm.START_WAIT, Comm.START_DATA, Comm.NEXT]:
+            self.obs.next()
+        elif transmission is Comm.FINISHED:
+            self.obs.next()
+            self.finished = True
+        elif transmission is Comm.SEND_TEL_NORTH:
+            self.telescope.direction = 1
+        elif transmission is Comm.SEND_TEL_SOUTH:
+            self.telescope.direction = -1
+
+        self.previous_transmission = transmission
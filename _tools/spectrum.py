@@ -1,5 +1,4 @@
-import time
-from tools import Comm, MyPrecious, Observation, ObsType
+from tools import Comm, Observation, ObsType
 
 
 class Spectrum(Observation):
@@ -15,6 +14,9 @@ class Spectrum(Observation):
         self.cal_freq = 3
         self.data_freq = 10
 
+        # Keep the filter short so it doesn't smear across frequency steps
+        self.filter_span = 3
+
         # These are the radio frequency (e.g. 1319.5 Mhz), not the sampling frequency!
         self.interval = 1
         self.freq_time = None
@@ -26,20 +28,16 @@ class Spectrum(Observation):
     def set_data_time(self, data_start, data_end):
         super().set_data_time(data_start, data_start + 180)
 
-    def set_files(self):
-        self.file_a = MyPrecious(self.name + "_a.md1")
-        self.file_b = MyPrecious(self.name + "_b.md1")
-        self.file_comp = MyPrecious(self.name + "_comp.md1")
-
     def data_logic(self, data_point) -> Comm:
         if self.freq_time is None:
-            self.freq_time = time.time()
+            self.freq_time = self.now()
             self.write_data(data_point)
             return Comm.NO_ACTION
-        elif time.time() - self.freq_time < self.timing_margin * self.interval:
+        elif self.now() - self.freq_time < self.timing_margin * self.interval:
             self.write_data(data_point)
             return Comm.NO_ACTION
         else:
-            self.freq_time = time.time()
+            self.freq_time = self.now()
             self.write_data(data_point)
+            self.reset_filter()  # The operator moves to the next frequency
             return Comm.BEEP
@@ -0,0 +1,141 @@
+"""
+Live stripchart of both channels, drawn incrementally from array-backed buffers.
+"""
+
+import numpy as np
+from PyQt5 import QtChart, QtCore, QtGui
+
+from .samplering import TIME, A, B
+
+
+def minmax_envelope(
+    times: np.ndarray, values: np.ndarray, buckets: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a trace to the minimum and maximum of each of 'buckets' equal spans of
+    time, so that it can be drawn with at most two points per pixel while every
+    spike stays visible. Short traces are returned as they are.
+    """
+    if len(times) <= 2 * buckets:
+        return times, values
+    edges = np.linspace(times[0], times[-1], buckets + 1)[:-1]
+    starts = np.unique(np.searchsorted(times, edges))
+    ends = np.append(starts[1:], len(times)) - 1
+    lows = np.minimum.reduceat(values, starts)
+    highs = np.maximum.reduceat(values, starts)
+    return (
+        np.column_stack((times[starts], times[ends])).ravel(),
+        np.column_stack((lows, highs)).ravel(),
+    )
+
+
+class Stripchart:
+    """
+    Owns the chart's two line series, its one time axis and the pens, all created
+    once. New samples are appended to numpy buffers and, on each draw(), whatever
+    has scrolled off the chart is trimmed from the front by index and each series
+    is handed its points in a single replace(), reduced to a min/max envelope if
+    there are more than the chart has pixels to show. The chart is rotated: x is
+    the voltage, scaled to fit what is on the chart, and y is sidereal time.
+    """
+
+    CAPACITY = 4096  # samples; the buffers grow if the chart holds more
+    MIN_VOLT_SPAN = 0.01  # V across the chart, so a flat trace isn't all noise
+    HIDDEN = QtGui.QColor(0, 0, 0, 0)
+
+    def __init__(self, chart: QtChart.QChart, colors: tuple[int, int]):
+        self.chart = chart
+        self.pens = [QtGui.QPen(QtGui.QColor(color)) for color in colors]
+        self.hidden_pen = QtGui.QPen(Stripchart.HIDDEN)
+        self.visibility = (True, True)
+
+        self.times = np.zeros(Stripchart.CAPACITY)
+        self.volts = np.zeros((Stripchart.CAPACITY, 2))
+        self.start = 0  # Oldest sample still on the chart
+        self.end = 0
+
+        self.series = [QtChart.QLineSeries(), QtChart.QLineSeries()]
+        self.axis_x = QtChart.QValueAxis()
+        self.axis_y = QtChart.QValueAxis()
+        self.chart.addAxis(self.axis_x, QtCore.Qt.AlignBottom)
+        self.chart.addAxis(self.axis_y, QtCore.Qt.AlignLeft)
+        for series, pen in zip(reversed(self.series), reversed(self.pens)):
+            self.chart.addSeries(series)  # A is drawn on top of B
+            series.attachAxis(self.axis_x)
+            series.attachAxis(self.axis_y)
+            series.setPen(pen)
+        for axis in (self.axis_x, self.axis_y):
+            axis.setVisible(False)
+
+    def add(self, rows: np.ndarray):
+        """Append samples (rows of a SampleRing)"""
+        if len(rows) == 0:
+            return
+        if self.end + len(rows) > len(self.times):
+            self.__make_room(len(rows))
+        self.times[self.end:self.end + len(rows)] = rows[:, TIME]
+        self.volts[self.end:self.end + len(rows)] = rows[:, [A, B]]
+        self.end += len(rows)
+
+    def clear(self):
+        self.start = self.end = 0
+
+    def set_visibility(self, visibility: tuple[bool, bool]):
+        if visibility == self.visibility:
+            return
+        self.visibility = visibility
+        for series, pen, visible in zip(self.series, self.pens, visibility):
+            series.setPen(pen if visible else self.hidden_pen)
+
+    def draw(self, newest: float, span: float, resolution: int | None = None):
+        """Show the 'span' seconds up to sidereal second 'newest', with at most
+        about 'resolution' rows of detail (pixels) along the time axis"""
+        oldest = newest - span
+
+        # Keep one point off the chart so the lines run all the way to the edge
+        first = np.searchsorted(self.times[self.start:self.end], oldest) - 1
+        self.start += max(first, 0)
+
+        times = self.times[self.start:self.end]
+        volts = self.volts[self.start:self.end]
+        for channel, series in enumerate(self.series):
+            y, x = times, volts[:, channel]
+            if resolution is not None:
+                y, x = minmax_envelope(y, x, resolution)
+            series.replace(self.__polygon(x, y))
+        self.axis_y.setRange(oldest, newest)
+        if len(volts) > 0:
+            low, high = volts.min(), volts.max()
+            middle, half = (low + high) / 2, max(high - low, self.MIN_VOLT_SPAN) / 2
+            self.axis_x.setRange(middle - half, middle + half)
+
+    def __len__(self) -> int:
+        """Number of samples held"""
+        return self.end - self.start
+
+    # HELPER FUNCTIONS
+
+    def __make_room(self, count: int):
+        """Move the held samples to the front of the buffers, growing them if needed"""
+        held = self.end - self.start
+        if held + count > len(self.times):
+            size = max(2 * len(self.times), held + count)
+            times, volts = np.zeros(size), np.zeros((size, 2))
+        else:
+            times, volts = self.times, self.volts
+        times[:held] = self.times[self.start:self.end]
+        volts[:held] = self.volts[self.start:self.end]
+        self.times, self.volts = times, volts
+        self.start, self.end = 0, held
+
+    @staticmethod
+    def __polygon(x: np.ndarray, y: np.ndarray) -> QtGui.QPolygonF:
+        """Points filled in straight through the polygon's memory"""
+        polygon = QtGui.QPolygonF(len(x))
+        if len(x) > 0:
+            pointer = polygon.data()
+            pointer.setsize(len(x) * 2 * np.dtype(np.float64).itemsize)
+            points = np.frombuffer(pointer, dtype=np.float64).reshape(-1, 2)
+            points[:, 0] = x
+            points[:, 1] = y
+        return polygon
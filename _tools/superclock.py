@@ -1,45 +1,130 @@
 """Clock for keeping track of the time and running functions at different intervals"""
 
 from __future__ import annotations
-from math import floor
+import functools
+import heapq
+import itertools
+from math import cos, floor, radians, sin
 import time
 import datetime
 from typing import Callable
-from astropy.time import Time
-from astropy.coordinates import EarthLocation
 
 SIDEREAL = 1.00273790935  # The number of sidereal seconds per second
 GB_LATITUDE = 38.437235  # North
 GB_LONGITUDE = -79.839835  # West (so negative)
+J2000 = 946728000.0  # Epoch time of JD 2451545.0, 2000-01-01 12:00 UT
 
 
-class SuperClock:
-    """Clock object for encapsulation; keeps track of the time(tm)"""
+def greenwich_sidereal_time(epoch_time: float) -> float:
+    """
+    Apparent sidereal time at Greenwich, in seconds, at an epoch time: the IAU 1982
+    expression for mean sidereal time plus the equation of the equinoxes from the
+    two largest nutation terms. Good to a few hundredths of a second, except that
+    UTC is taken for UT1; they differ by up to 0.9s, which only the IERS tables know.
+    """
+    days = (epoch_time - J2000) / 86400
+    centuries = days / 36525
+    mean = 18.697374558 + 24.06570982441908 * days + 0.000026 * centuries**2  # h
 
-    def __init__(self):
-        self.timers = []
+    # Nutation in longitude, projected onto the equator
+    node = radians(125.04 - 0.052954 * days)  # Of the Moon's orbit
+    sun = radians(280.47 + 0.98565 * days)  # Mean longitude
+    obliquity = radians(23.4393 - 0.0000004 * days)
+    nutation = -0.000319 * sin(node) - 0.000024 * sin(2 * sun)  # h
+    return (mean + nutation * cos(obliquity)) * 3600 % 86400
 
-        loc = EarthLocation(lat=GB_LATITUDE, lon=GB_LONGITUDE)
-        t = Time(time.time(), format="unix", scale="utc", location=loc)
-        current_ra = SuperClock.hours_to_seconds(t.sidereal_time("apparent").value)
-        self.calibrate_sidereal_time(current_ra)
 
-    def calibrate_sidereal_time(self, starting_sidereal_time: float):
-        current_time = time.time()
-        corrected_sidereal_time = (starting_sidereal_time) % 86400
+def local_sidereal_time(epoch_time: float, longitude: float = GB_LONGITUDE) -> float:
+    """Apparent local sidereal time, in seconds, at an epoch time"""
+    return (greenwich_sidereal_time(epoch_time) + longitude * 240) % 86400
+
+
+def astropy_sidereal_time(
+    epoch_time: float, longitude: float = GB_LONGITUDE, latitude: float = GB_LATITUDE
+) -> float:
+    """local_sidereal_time as astropy works it out, for checking it; slow, since
+    astropy is only imported here"""
+    from astropy.coordinates import EarthLocation
+    from astropy.time import Time
+
+    configure_iers()
+    location = EarthLocation(lat=latitude, lon=longitude)
+    t = Time(epoch_time, format="unix", scale="utc", location=location)
+    return SuperClock.hours_to_seconds(t.sidereal_time("apparent").value)
+
+
+@functools.cache
+def configure_iers() -> float:
+    """
+    Set astropy up never to go online: Earth orientation comes from the IERS-A table
+    bundled with astropy-iers-data, or a newer copy already in astropy's download
+    cache, and times past its end only warn. Returns the age of the table, in days
+    since its first predicted value; predictions run a year ahead.
+    """
+    from astropy.time import Time
+    from astropy.utils import data, iers
+
+    data.conf.allow_internet = False
+    iers.conf.auto_download = False
+    iers.conf.auto_max_age = None
+    iers.conf.iers_degraded_accuracy = "warn"
+
+    table = iers.IERS_Auto.open()  # The bundled table, with downloads off
+    for url in [iers.IERS_A_URL, iers.IERS_A_URL_MIRROR]:
+        if data.is_url_in_cache(url, on_missing="ignore"):
+            cached = iers.IERS_A.open(url, cache=True)
+            if cached.meta["predictive_mjd"] > table.meta["predictive_mjd"]:
+                table = cached
+    iers.earth_orientation_table.set(table)
+    return Time.now().mjd - table.meta["predictive_mjd"]
+
+
+class SuperClock:
+    """
+    Clock object for encapsulation; keeps track of the time(tm). The wall clock is
+    only read when the clock is anchored, at construction and at each sidereal
+    calibration; from then on all times are derived from the monotonic,
+    high-resolution performance counter, so stepping the system clock (NTP, DST
+    mishaps) can't warp durations, timers or sidereal time.
+
+    The acquisition thread reads the time while the GUI thread may be calibrating,
+    so the anchor and calibration are kept in one tuple, 'base', that is replaced
+    in a single assignment and read once per call.
+    """
 
-        self.starting_epoch_time: float = 0.0
-        # Time, in seconds, since the sidereal midnight before last calibration
-        self.starting_sidereal_time = 0.0
+    def __init__(self, sidereal_time: float | None = None):
+        """Starts at the current local sidereal time, unless given 'sidereal_time'
+        (in seconds)"""
+        # ((performance counter ns, epoch time) anchor, epoch time of calibration,
+        # sidereal seconds since the sidereal midnight before calibration)
+        self.__base = (self.__anchor(), 0.0, 0.0)
+        self.timers: list[Timer] = []
+        # Heap of (deadline, tiebreak, generation, timer); entries whose generation
+        # is no longer their timer's are stale and skipped when they surface
+        self.__schedule: list[tuple[float, int, int, Timer]] = []
+        self.__tiebreak = itertools.count()
+
+        if sidereal_time is None:
+            sidereal_time = local_sidereal_time(self.get_time())
+        self.calibrate_sidereal_time(sidereal_time)
 
-        self.set_starting_time(current_time)
-        self.set_starting_sidereal_time(corrected_sidereal_time)
+    def calibrate_sidereal_time(self, starting_sidereal_time: float):
+        anchor = self.__anchor()
+        current_time = self._time_at(anchor)
+        self.__base = (anchor, current_time, starting_sidereal_time % 86400)
+        self.anchor_time = current_time
+        self.reset_all_timer_anchors()
 
         print(f"{self.starting_sidereal_time=}, {self.starting_epoch_time=}")
 
-    @staticmethod
-    def get_time() -> float:
-        return time.time()
+    def get_time(self) -> float:
+        """Current epoch time, as of the last anchoring plus monotonic elapsed time"""
+        return self._time_at(self.__base[0])
+
+    def _time_at(self, anchor: tuple[int, float]) -> float:
+        """Current epoch time, from a (performance counter ns, epoch time) anchor"""
+        anchor_ns, anchor_epoch_time = anchor
+        return anchor_epoch_time + (time.perf_counter_ns() - anchor_ns) / 1e9
 
     @staticmethod
     def solar_to_sidereal(solar_seconds: float) -> float:
@@ -54,10 +139,9 @@ class SuperClock:
         """Get timestamp suitable for file naming"""
         return "{:%Y.%m.%d-%H.%M}".format(datetime.datetime(*time.localtime()[:5]))
 
-    @staticmethod
-    def get_time_until(destination_time) -> float:
+    def get_time_until(self, destination_time) -> float:
         """Positive means it already happened, negative means it will happen"""
-        return time.time() - destination_time
+        return self.get_time() - destination_time
 
     @staticmethod
     def deformat_time_string(time_string: str) -> float:
@@ -70,37 +154,73 @@ class SuperClock:
         return hours * 3600
     
     def run_timers(self) -> None:
-        """Run every timer that is due to run"""
-        for timer in self.timers:
-            timer.run_if_appropriate()
+        """Run every timer that is due to run; only looks at timers that are due"""
+        current_time = self.get_time()
+        while self.__schedule and self.__schedule[0][0] <= current_time:
+            _, _, generation, timer = heapq.heappop(self.__schedule)
+            if generation != timer.generation:
+                continue  # Cancelled or rescheduled since
+            timer.run_if_appropriate(current_time)
+
+    def next_due(self) -> float | None:
+        """Seconds until the next timer is due (0 if one is overdue), or None if no
+        timer is scheduled; e.g. for arming a single-shot QTimer"""
+        while self.__schedule:
+            deadline, _, generation, timer = self.__schedule[0]
+            if generation == timer.generation:
+                return max(0.0, deadline - self.get_time())
+            heapq.heappop(self.__schedule)
+        return None
+
+    def schedule(self, timer: Timer) -> None:
+        """(Re)queue a timer for its next deadline, superseding any earlier entry"""
+        timer.generation += 1
+        if timer.period > 0:
+            heapq.heappush(
+                self.__schedule,
+                (timer.deadline(), next(self.__tiebreak), timer.generation, timer),
+            )
 
     def reset_all_timer_anchors(self) -> None:
-        current_time = time.time()
+        current_time = self.get_time()
         for timer in self.timers:
             timer.anchor_time = current_time
+            self.schedule(timer)
 
     def add_timer(self, period: int, callback, name="", log=False) -> Timer:
         """Set a timer to call a function periodically"""
-        new_timer = Timer(period, callback, name, log)
+        new_timer = Timer(period, callback, name, log, clock=self)
         self.timers.append(new_timer)
+        self.schedule(new_timer)
         return new_timer
 
     def set_starting_sidereal_time(self, sidereal_time: float) -> None:
-        self.starting_sidereal_time = sidereal_time
+        anchor, epoch_time, _ = self.__base
+        self.__base = (anchor, epoch_time, sidereal_time)
 
     def set_starting_time(self, epoch_time: float) -> None:
         """Set starting time and anchor time to specified time"""
-        self.starting_epoch_time = epoch_time
+        anchor, _, sidereal_time = self.__base
+        self.__base = (anchor, epoch_time, sidereal_time)
         self.anchor_time = epoch_time
         self.reset_all_timer_anchors()
 
+    @property
+    def starting_epoch_time(self) -> float:
+        return self.__base[1]
+
+    @property
+    def starting_sidereal_time(self) -> float:
+        return self.__base[2]
+
     def reset_anchor_time(self) -> None:
         """Set anchor time to current time"""
-        self.anchor_time = time.time()
+        self.anchor_time = self.get_time()
         self.reset_all_timer_anchors()
 
     def get_elapsed_time(self) -> float:
-        return time.time() - self.starting_epoch_time
+        anchor, epoch_time, _ = self.__base
+        return self._time_at(anchor) - epoch_time
 
     def get_starting_epoch_time(self) -> float:
         """Solar time of last calibration as epoch date"""
@@ -112,7 +232,8 @@ class SuperClock:
     
     def get_sidereal_seconds(self) -> float:
         """Sidereal seconds since the sidereal midnight before calibration"""
-        return self.starting_sidereal_time + SIDEREAL * self.get_elapsed_time()
+        anchor, epoch_time, sidereal_time = self.__base
+        return sidereal_time + SIDEREAL * (self._time_at(anchor) - epoch_time)
 
     def get_sidereal_tuple(self) -> tuple:
         """Return an hours, minutes, seconds tuple of local sidereal time"""
@@ -127,6 +248,35 @@ class SuperClock:
         hours, minutes, seconds = self.get_sidereal_tuple()
         return f"{hours:02.0f}:{minutes:02.0f}:{seconds:02.0f}"
 
+    def get_sidereal_error(self) -> float:
+        """Seconds this clock is ahead of astropy's local sidereal time (negative
+        if behind); slow, and raises ImportError without astropy"""
+        epoch_time, sidereal_time = self.get_time(), self.get_sidereal_seconds()
+        error = sidereal_time - astropy_sidereal_time(epoch_time)
+        return (error + 43200) % 86400 - 43200
+
+    # HELPER FUNCTIONS
+
+    @staticmethod
+    def __anchor() -> tuple[int, float]:
+        """Pin the performance counter to the wall clock"""
+        return time.perf_counter_ns(), time.time()
+
+
+class VirtualClock(SuperClock):
+    """A SuperClock whose time stands still except when advance() is called, for
+    running observations much faster (or slower) than real time"""
+
+    def __init__(self, start_time: float, sidereal_time: float = 0.0):
+        self.virtual_time = start_time
+        super().__init__(sidereal_time)
+
+    def _time_at(self, anchor: tuple[int, float]) -> float:
+        return self.virtual_time
+
+    def advance(self, seconds: float) -> None:
+        self.virtual_time += seconds
+
 
 class Timer:
     """A timer for syncing things that run at different, variable rates
@@ -136,29 +286,65 @@ class Timer:
         callback (Callable[[], None]): function to call when the timer runs
         name (str): name of the timer
         log (bool): whether to print the timer's name and status when it runs
+        clock (SuperClock): clock that schedules the timer, if any
     """
 
-    def __init__(self, period: int, callback: Callable[[], None], name: str, log: bool):
+    def __init__(
+        self,
+        period: int,
+        callback: Callable[[], None],
+        name: str,
+        log: bool,
+        clock: SuperClock | None = None,
+    ):
         self.period = period  # ms
         self.callback = callback
         # self.offset = 0
-        self.anchor_time: float = time.time()
         self.name = name
         self.log = log
+        self.clock = clock
+        self.anchor_time: float = self.now()
+        self.generation = 0  # Bumped whenever the timer is rescheduled
+
+        # How late each run was, in seconds
+        self.lateness = 0.0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+        self.runs = 0
 
     def run(self) -> None:
         self.callback()
 
-    def run_if_appropriate(self) -> bool:
+    def now(self) -> float:
+        return self.clock.get_time() if self.clock is not None else time.time()
+
+    def deadline(self) -> float:
+        """Epoch time of the next run"""
+        return self.anchor_time + self.period / 1000
+
+    def run_if_appropriate(self, current_time: float | None = None) -> bool:
         if self.period <= 0:
             return False
 
-        current_time = time.time()
-        elapsed_periods, extra_time = divmod(current_time - self.anchor_time, self.period/ 1000)
-        if elapsed_periods > 0:
-            if self.log or True:
+        if current_time is None:
+            current_time = self.now()
+        if current_time >= self.deadline():  # The same test the schedule uses
+            # Time since the last whole period; more than the lateness only if
+            # rounding wrapped it around
+            extra_time = (current_time - self.anchor_time) % (self.period / 1000)
+            if extra_time > current_time - self.deadline():
+                extra_time = 0.0
+            if self.log:
                 print(f"{self.name}: {self.anchor_time=}, {current_time=}, {self.period=}")
+            lateness = current_time - self.deadline()
+            self.lateness = lateness
+            self.max_lateness = max(self.max_lateness, lateness)
+            self.total_lateness += lateness
+            self.runs += 1
+
             self.anchor_time = current_time - extra_time
+            if self.clock is not None:
+                self.clock.schedule(self)  # Before the callback, which may change it
             self.run()
             return True
         return False
@@ -169,11 +355,17 @@ class Timer:
             new_period (int): in milliseconds
         """
         if self.period != new_period:
-            self.anchor_time = time.time()
-        self.period = new_period
+            self.anchor_time = self.now()
+            self.period = new_period
+            if self.clock is not None:
+                self.clock.schedule(self)
 
     def cancel(self) -> None:
-        self.period = 0
+        self.set_period(0)
+
+    def mean_lateness(self) -> float:
+        """Mean time each run came after it was due, in seconds"""
+        return self.total_lateness / self.runs if self.runs > 0 else 0.0
 
     def __repr__(self) -> str:
         return f"Timer({self.period}ms, {self.callback})"
@@ -1,4 +1,4 @@
-from tools import Comm, MyPrecious, Observation, ObsType
+from tools import Comm, Observation, ObsType
 
 
 class Survey(Observation):
@@ -7,17 +7,12 @@ class Survey(Observation):
     def __init__(self):
         super().__init__()
         self.obs_type = ObsType.SURVEY
+        self.file_extension = ".md2"
 
-        self.sweep_number = 1
+        self.sweep_number = 0  # Incremented as each sweep enters the range
 
         self.outside = True
 
-    def set_files(self):
-        assert self.name
-        self.file_a = MyPrecious(self.name + "_a.md2")
-        self.file_b = MyPrecious(self.name + "_b.md2")
-        self.file_comp = MyPrecious(self.name + "_comp.md2")
-
     def data_logic(self, data_point) -> Comm:
         if data_point.dec < self.min_dec or data_point.dec > self.max_dec:
             if not self.outside:
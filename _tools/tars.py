@@ -10,6 +10,8 @@ from .myserial import MySerial
 import serial.tools.list_ports
 import time
 
+import numpy as np
+
 import random as r  # For testing
 import math
 
@@ -39,6 +41,25 @@ def convert(buffer: list, volt: int) -> float:
     return volt * int.from_bytes(buffer, byteorder="little", signed=True) / 32768
 
 
+def channel_scales(channels: list[int]) -> np.ndarray:
+    """Volts per count for each channel in the scan list"""
+    return np.array([Tars.RANGE_VOLT[channel >> 8] for channel in channels]) / 32768
+
+
+def decode_block(buffer: bytes, scales: np.ndarray) -> tuple[np.ndarray, bytes]:
+    """
+    Decode every complete frame in a chunk of the binary DATAQ stream. A frame is one
+    little-endian int16 word per channel, in scan list order. Returns an array of
+    volts with one row per frame and one column per channel, plus whatever bytes
+    were left over from an incomplete frame; pass those back in front of the next
+    chunk so the channels never slip out of alignment.
+    """
+    frame_size = 2 * len(scales)
+    usable = len(buffer) - len(buffer) % frame_size
+    counts = np.frombuffer(buffer, dtype="<i2", count=usable // 2)
+    return 5 + counts.reshape(-1, len(scales)) * scales, buffer[usable:]
+
+
 class Tars:
     """
     A wrapper class of a serial object which supports functionalities specifically
@@ -48,6 +69,16 @@ class Tars:
     RANGE_VOLT = (10, 5, 2, 1, 0.5, 0.2)
     RANGE_RATE = (50000, 20000, 10000, 5000, 2000, 1000, 500, 200, 100, 50, 20, 10)
 
+    # Sample rate = 60,000,000/(srate * dec) = 60,000,000/(1171 * 512) = 100 Hz
+    DEC = 512
+    SRATE = 1171
+    SAMPLE_RATE = 60_000_000 / (SRATE * DEC)  # Hz
+
+    # Simulated signal until the testing frame says otherwise (dial values)
+    NOISE = 4
+    VARIANCE = 8
+    POLARIZATION = 4
+
     def __init__(self, parent, device=None):
         self.parent = parent
         
@@ -60,8 +91,17 @@ class Tars:
             0x0100,  # Channel 0, telescope channel A, ±5 V range
             0x0101,  # Channel 1, telescope channel B, ±5 V range
         ]
+        self.scales = channel_scales(self.channels)
+        self.remainder = b""  # Bytes of a partially received frame
         self.acquiring = False
 
+        # Simulated signal, set from the testing frame on the GUI thread; widgets
+        # can't be read from the acquisition thread
+        self.noise = Tars.NOISE
+        self.variance = Tars.VARIANCE
+        self.polarization = Tars.POLARIZATION
+        self.calibration = False
+
         self.setup()
 
     def start(self):
@@ -78,37 +118,39 @@ class Tars:
             return
         self.send("stop")
         self.ser.reset_input_buffer()
+        self.remainder = b""
         self.acquiring = False
 
-    def _read_one(self) -> SignalDatum | None:
+    def read_block(self) -> np.ndarray | None:
         """
-        This reads one datapoint from the buffer. Each datapoint has three channels:
-        channel 0: telescope channel A
-        channel 1: telescope channel B
+        Drain everything waiting in the serial buffer with a single read and decode
+        it. Returns an array with one row per sample and one column per channel:
+        column 0: telescope channel A
+        column 1: telescope channel B
         """
         if self.testing:
-            return self.random_data()
+            datum = self.random_data()
+            return np.array([[datum.a, datum.b]])
 
-        if self.in_waiting() < (2 * len(self.channels)):
+        waiting = self.in_waiting()
+        if waiting == 0:
             return None
-        buffer_output = [
-            (channel & 3, self.buffer_read(channel)) for channel in self.channels
-        ]
-        return SignalDatum(a=buffer_output[0], b=buffer_output[1])
+        block, self.remainder = decode_block(
+            self.remainder + self.ser.read(waiting), self.scales
+        )
+        if len(block) == 0:
+            return None
+        return block
 
     def read_latest(self) -> SignalDatum | None:
         """
         This function reads the last datapoint from the buffer and clears the buffer.
         Use this as a real-time sampling method.
         """
-        if self.testing:
-            return self.random_data()
-        current = self._read_one()
-        latest = None
-        while current is not None:
-            latest = current
-            current = self._read_one()
-        return latest
+        block = self.read_block()
+        if block is None:
+            return None
+        return SignalDatum(a=float(block[-1, 0]), b=float(block[-1, 1]))
 
     # Helpers
 
@@ -128,10 +170,9 @@ class Tars:
         for i in range(0, len(self.channels)):
             self.send("slist " + str(i) + " " + str(self.channels[i]))
 
-        # Define sample rate = 100 Hz:
-        # 60,000,000/(srate * dec) = 60,000,000/(1171 * 512) = 100 Hz
-        self.send("dec 512")
-        self.send("srate 1171")
+        # Define sample rate, see SAMPLE_RATE
+        self.send("dec " + str(Tars.DEC))
+        self.send("srate " + str(Tars.SRATE))
 
         # self.send("dec 512")
         # self.send("srate 11718")
@@ -141,25 +182,6 @@ class Tars:
             return 0
         return self.ser.in_waiting
 
-    def buffer_read(self, channel: int) -> float | None:
-        """
-        This function reads one value from the serial buffer. I.E. it will only read
-        *one channel* at a time. Therefore, do not use this function by itself. If data
-        is not always read in pairs of three there's no way to tell the channels apart.
-        """
-        if self.testing:
-            return None
-
-        if self.in_waiting() < 2:
-            return None
-        buffer = self.ser.read(2)
-        return (
-            5
-            + Tars.RANGE_VOLT[channel >> 8]
-            * int.from_bytes(buffer, byteorder="little", signed=True)
-            / 32768
-        )
-
     # - MARK: Testing
 
     def random_data(self) -> SignalDatum:
@@ -167,11 +189,11 @@ class Tars:
         x = time.time() / 8
 
         n = r.choice([-0.2, 1]) / (64 * (r.random() + 0.02))
-        n *= 0.08 * self.parent.ui.noise_dial.value() ** 2
+        n *= 0.08 * self.noise**2
 
-        v = self.parent.ui.variance_dial.value()
+        v = self.variance
 
-        c = 1 if self.parent.ui.calibration_check_box.isChecked() else 0
+        c = 1 if self.calibration else 0
 
         f = 0
         # f = math.sin(4 * x)
@@ -184,7 +206,7 @@ class Tars:
         )
 
         a = f + g * v + n + c
-        b = a - 0.1 * self.parent.ui.polarization_dial.value() * g * (v / 2 + 1)
+        b = a - 0.1 * self.polarization * g * (v / 2 + 1)
 
         a, b = (i / 272 + c + 1 for i in (a, b))  # Normalize, kinda
 
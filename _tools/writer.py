@@ -0,0 +1,160 @@
+"""
+Background writer so that slow disks never hold up the GUI thread.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+from tools import MyPrecious
+
+
+class AsyncWriter(threading.Thread):
+    """
+    Takes (file, line) records through a bounded queue and writes them on its own
+    thread, so the files it is handed are only ever touched from here. Whatever has
+    piled up in the queue is written as one batch. If the queue fills, write()
+    blocks rather than dropping data.
+
+    If writing fails (disk full, drive pulled out), the thread records the error in
+    'error' and stops. From then on, and if the thread was never started, records
+    are written in the caller's thread, in order, so failures reach the caller
+    instead of the queue filling up behind a dead thread.
+    """
+
+    MAX_QUEUE = 16384  # records
+    MAX_BATCH = 4096  # records
+    PUT_TIMEOUT = 0.1  # s between checks that the thread is still alive
+
+    __CLOSE = object()
+    __FLUSH = object()
+    __FLUSH_IF_DUE = object()
+    __STOP = object()
+
+    def __init__(self, max_queue: int = MAX_QUEUE):
+        super().__init__(name="writer", daemon=True)
+        self.queue: queue.Queue = queue.Queue(max_queue)
+        self.error: Exception | None = None
+        self.__leftover: deque = deque()  # Records the thread failed to write
+
+        # Statistics
+        self.max_queue_depth = 0
+        self.batches = 0
+        self.records = 0
+        self.total_latency = 0.0  # s
+        self.max_latency = 0.0  # s
+
+    def write(self, file: MyPrecious, line: str):
+        self.__send((file, line))
+
+    def close_files(self, *files: MyPrecious):
+        """Close files once everything queued for them so far is written"""
+        for file in files:
+            self.__send((file, AsyncWriter.__CLOSE))
+
+    def flush_files(self, *files: MyPrecious, if_due: bool = False):
+        """Flush files (with 'if_due', only those due) once everything queued for
+        them so far is written"""
+        flush = AsyncWriter.__FLUSH_IF_DUE if if_due else AsyncWriter.__FLUSH
+        for file in files:
+            self.__send((file, flush))
+
+    def stop(self):
+        """Write everything still queued, then end the thread"""
+        if self.is_alive() and self.__put((None, AsyncWriter.__STOP)):
+            self.join()
+        self.__write_here()  # Whatever a failed or unstarted thread left behind
+
+    def run(self):
+        running = True
+        while running:
+            batch = deque([self.queue.get()])
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize() + 1)
+            while len(batch) < AsyncWriter.MAX_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            start = time.perf_counter()
+            records = len(batch)
+            try:
+                running = self.__process(batch)
+            except Exception as error:
+                self.__leftover = batch  # Starting with the record that failed
+                self.error = error  # Last, as it hands the files to write()
+                return
+            latency = time.perf_counter() - start
+
+            self.batches += 1
+            self.records += records
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def mean_latency(self) -> float:
+        """Mean time to write one batch, in seconds"""
+        return self.total_latency / self.batches if self.batches > 0 else 0.0
+
+    def get_report(self) -> str:
+        report = (
+            f"{self.records} records in {self.batches} batches, "
+            f"max queue depth {self.max_queue_depth}, "
+            f"mean/max write latency {1000 * self.mean_latency():.2f}/"
+            f"{1000 * self.max_latency:.2f}ms"
+        )
+        if self.error is not None:
+            report += f", failed: {self.error!r}"
+        return report
+
+    # HELPER FUNCTIONS
+
+    def __send(self, record: tuple):
+        """Queue a record for the thread, or write it here if the thread can't"""
+        if self.error is None and self.__put(record):
+            return
+        self.__write_here(record)
+
+    def __put(self, record: tuple) -> bool:
+        """Queue a record, waiting for room unless the thread isn't running"""
+        while True:
+            try:
+                self.queue.put(record, timeout=AsyncWriter.PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                if not self.is_alive():
+                    return False
+
+    def __write_here(self, *new: tuple):
+        """Write everything the thread didn't, then any 'new' records, in order, in
+        the calling thread. Whatever fails is kept to be tried again next time."""
+        records = self.__leftover
+        while True:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        records.extend(new)
+        self.__process(records)
+
+    @staticmethod
+    def __process(records: deque) -> bool:
+        """Carry out records in order, removing each once done; False on a stop"""
+        while records:
+            file, line = records[0]
+            if line is AsyncWriter.__STOP:
+                records.popleft()
+                return False
+            if line is AsyncWriter.__CLOSE:
+                file.close()
+            elif line is AsyncWriter.__FLUSH:
+                file.flush()
+            elif line is AsyncWriter.__FLUSH_IF_DUE:
+                file.flush_if_due()
+            else:
+                file.write(line)
+            records.popleft()
+        return True
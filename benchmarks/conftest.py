@@ -0,0 +1,14 @@
+"""
+Synthetic inputs shared by the benchmarks. Everything random comes from one fixed
+seed, so every run measures exactly the same work.
+"""
+
+import numpy as np
+import pytest
+
+SEED = 1420  # MHz
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(SEED)
@@ -0,0 +1,17 @@
+from tools import DecCalc
+
+INPUTS = 10_000
+
+
+def test_calculate_declination(benchmark, rng):
+    """Raw declinometer readings across the calibration and a little beyond it"""
+    dec_calc = DecCalc()
+    raw = [i * 0.01 for i in range(-90, 91, 15)]  # load_dec_cal's default
+    dec_calc.fx = [DecCalc.XY(x, y) for x, y in zip(raw, DecCalc.get_dec_list())]
+    inputs = rng.uniform(-1, 1, INPUTS).tolist()
+
+    def calculate():
+        return [dec_calc.calculate_declination(x) for x in inputs]
+
+    benchmark.extra_info["inputs"] = INPUTS
+    assert len(benchmark(calculate)) == INPUTS
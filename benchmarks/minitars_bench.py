@@ -0,0 +1,42 @@
+from tools import MiniTars
+
+LINES = 1000  # Waiting in the serial buffer at each read
+
+
+class Parent:
+    def log(self, message: str):
+        pass
+
+
+class Declinometer:
+    """The far end of the serial port, with angles one per line already sent"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.data) - self.position
+
+    def read_until(self, expected: bytes = b"\n") -> bytes:
+        end = self.data.find(expected, self.position)
+        end = len(self.data) if end == -1 else end + len(expected)
+        line = self.data[self.position:end]
+        self.position = end
+        return line
+
+
+def test_read_latest(benchmark, rng):
+    """Parse a backlog of declinometer lines down to the latest angle"""
+    angles = rng.uniform(-90, 90, LINES)
+    data = "".join("%.2f\r" % angle for angle in angles).encode("ascii")
+    minitars = MiniTars(Parent())
+    minitars.testing = False
+
+    def connect():
+        minitars.ser = Declinometer(data)
+
+    benchmark.extra_info["lines"] = LINES
+    latest = benchmark.pedantic(minitars.read_latest, setup=connect, rounds=200)
+    assert latest == round(angles[-1], 2)
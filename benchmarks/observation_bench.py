@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from tools import Comm, DataPoint, Scan, Spectrum, Survey, VirtualClock
+from _tools.observation import State
+
+POINTS = 1_000_000
+STEP = 0.01  # s between points
+MIN_DEC, MAX_DEC = 15, 25
+SWEEP = 120  # s from one end of a survey to the other
+
+ADVANCE = [Comm.START_CAL, Comm.START_BG, Comm.START_WAIT, Comm.START_DATA, Comm.NEXT]
+
+
+@pytest.fixture(scope="module")
+def points() -> list[DataPoint]:
+    """Sky sweeping back and forth across the survey's range, plus noise"""
+    rng = np.random.default_rng(1420)
+    times = np.arange(POINTS) * STEP
+    phase = np.abs((times / SWEEP) % 2 - 1)  # Triangle wave, 0 to 1
+    decs = MIN_DEC - 1 + (MAX_DEC - MIN_DEC + 2) * phase
+    a, b = rng.normal(1, 0.01, (2, POINTS))
+    return [DataPoint(*point) for point in zip(times, decs, a, b)]
+
+
+def observe(obs, points: list[DataPoint]) -> int:
+    """Hand the observation every point, STEP apart, going on to the next state as
+    soon as it asks; returns how many points it took"""
+    clock = VirtualClock(1_700_000_000.0)
+    lead = obs.cal_dur + obs.bg_dur + 30  # Before the start, as in the GUI
+    start = clock.get_time() + lead
+    obs.set_clock(clock)
+    obs.set_start_and_end_times(start, start + POINTS * STEP - 2 * lead)
+    obs.set_dec(MIN_DEC, MAX_DEC)
+
+    for count, point in enumerate(points, 1):
+        clock.advance(STEP)
+        comm = obs.communicate(point, clock.get_time())
+        if comm in ADVANCE:
+            obs.next()
+        elif comm is Comm.FINISHED:
+            obs.next()
+            return count
+    return len(points)
+
+
+@pytest.mark.parametrize("kind", [Scan, Survey, Spectrum])
+def test_communicate(benchmark, points, tmp_path, monkeypatch, kind):
+    """A whole observation, writing its files, with a call for every point"""
+    monkeypatch.chdir(tmp_path)
+    observations = []
+
+    def setup():
+        obs = kind()
+        obs.set_name("bench")
+        observations.append(obs)
+        return (obs, points), {}
+
+    benchmark.extra_info["points"] = POINTS
+    count = benchmark.pedantic(observe, setup=setup, rounds=3)
+    assert observations[-1].state is State.DONE
+    assert count > 0.9 * POINTS
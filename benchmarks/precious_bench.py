@@ -0,0 +1,24 @@
+import pytest
+
+from tools import MyPrecious
+
+VALUES = 100_000
+SEGMENT = 1000  # Values between '*' markers
+
+
+@pytest.mark.parametrize("durable", [False, True])
+def test_write(benchmark, rng, tmp_path, durable):
+    """Data values in segments, fsynced at each marker when durable"""
+    values = ["%.4f" % value for value in rng.normal(1, 0.01, VALUES)]
+    for i in range(SEGMENT, VALUES, SEGMENT):
+        values[i] = MyPrecious.SEGMENT_MARKER
+
+    def write():
+        file = MyPrecious("bench.md1", str(tmp_path), durable=durable)
+        for value in values:
+            file.write(value)
+        file.close()
+
+    benchmark.extra_info["values"] = VALUES
+    benchmark.pedantic(write, rounds=5)
+    assert (tmp_path / "bench.md1").stat().st_size > 0
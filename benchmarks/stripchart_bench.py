@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pytest
+from PyQt5 import QtChart, QtWidgets
+
+from tools import SampleRing, Stripchart, Tars, TIME, A, B
+from _tools.samplering import COLUMNS
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+FRAME = 1 / 60  # s
+HEIGHT = 500  # Pixels down the chart
+RETENTION = 600  # s held by the ring
+
+
+@pytest.mark.parametrize("span", [10, 120])
+def test_update_stripchart(benchmark, rng, span):
+    """
+    One frame of Threepio.update_stripchart with 'span' seconds on the chart:
+    take the new samples from the ring, append them and redraw. Publishing the
+    samples is not timed.
+    """
+    rate = Tars.SAMPLE_RATE
+    ring = SampleRing(int(RETENTION * rate))
+    feed = ring.subscribe()
+    stripchart = Stripchart(QtChart.QChart(), (0x2196F3, 0xFF5252))
+    published = 0
+    now = 0.0
+
+    def publish(until: float):
+        nonlocal published
+        count = int(until * rate) - published
+        rows = np.zeros((count, COLUMNS))
+        rows[:, TIME] = (published + np.arange(count)) / rate
+        rows[:, A] = rng.normal(1, 0.01, count)
+        rows[:, B] = rng.normal(2, 0.01, count)
+        ring.push(rows)
+        published += count
+
+    def next_frame():
+        nonlocal now
+        now += FRAME
+        publish(now)
+
+    def update_stripchart():
+        stripchart.add(feed.poll())
+        stripchart.draw(now, span, HEIGHT)
+
+    # Start with the chart full
+    now = span
+    publish(now)
+    update_stripchart()
+
+    benchmark.extra_info["span"] = span
+    benchmark.pedantic(update_stripchart, setup=next_frame, rounds=2000)
+    assert len(stripchart) > 0.99 * span * rate
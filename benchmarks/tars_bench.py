@@ -0,0 +1,26 @@
+import numpy as np
+
+from tools import Tars
+from _tools.tars import channel_scales, decode_block
+
+SECONDS = 60  # Of the DATAQ stream
+
+
+def test_decode_block(benchmark, rng):
+    """A minute of both channels, in reads of a couple of frames as they arrive"""
+    frames = int(SECONDS * Tars.SAMPLE_RATE)
+    stream = rng.integers(-32768, 32768, 2 * frames).astype("<i2").tobytes()
+    cuts = np.sort(rng.integers(0, len(stream), frames // 2))
+    chunks = [stream[start:end] for start, end in zip([0, *cuts], [*cuts, None])]
+    scales = channel_scales([0x0100, 0x0101])
+
+    def decode():
+        remainder = b""
+        decoded = 0
+        for chunk in chunks:
+            block, remainder = decode_block(remainder + chunk, scales)
+            decoded += len(block)
+        return decoded
+
+    benchmark.extra_info["samples"] = frames
+    assert benchmark(decode) == frames
@@ -0,0 +1,332 @@
+"""
+Run an observation from the command line, without the Qt GUI; e.g.
+
+    python headless.py scan --start 05:30:00 --end 06:30:00 --dec 20 --name crab
+
+Prompts that the GUI would show as alerts are printed, and wait for Enter unless
+--unattended is given. With --virtual the observation is instead fast-forwarded
+through a Simulation, for testing and benchmarking the pipeline.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from tools import (
+    Comm,
+    DataPoint,
+    Survey,
+    Scan,
+    Spectrum,
+    SuperClock,
+    VirtualClock,
+    Simulation,
+    Tars,
+    MiniTars,
+    discovery,
+    DecCalc,
+    ObsType,
+    Observation,
+    SampleRing,
+    Acquisition,
+    RawCapture,
+    TIME,
+    DEC,
+    A,
+    B,
+)
+
+OBSERVATIONS = {"scan": Scan, "survey": Survey, "spectrum": Spectrum}
+
+
+class Headless:
+    """
+    Threepio's acquisition and observation loop with the window taken away: the
+    acquisition thread publishes samples as usual, and the main thread sleeps until
+    the next timer is due, then hands the observation everything since.
+    """
+
+    SAMPLE_RETENTION_SECONDS = 600  # How long prompts may be left unanswered
+    PROGRESS_PERIOD = 60_000  # ms
+
+    def __init__(self, unattended: bool = False, log_file: str | None = None):
+        self.unattended = unattended
+        self.log_file = open(log_file, "a") if log_file is not None else None
+        self.clock = SuperClock()
+
+        dataq, declinometer = discovery()
+        self.tars = Tars(parent=self, device=dataq)
+        self.minitars = MiniTars(parent=self, device=declinometer)
+
+        self.dec_calc = DecCalc()
+        try:
+            self.dec_calc.load_dec_cal()
+        except FileNotFoundError:
+            self.log("Dec must be calibrated; using a default calibration")
+
+        self.samples = SampleRing(
+            int(self.SAMPLE_RETENTION_SECONDS * self.tars.SAMPLE_RATE)
+        )
+        self.data_feed = self.samples.subscribe()
+        self.acquisition = Acquisition(
+            self.tars, self.minitars, self.dec_calc, self.clock, self.samples
+        )
+
+        self.obs: Observation | None = None
+        self.raw_capture: RawCapture | None = None
+        self.current_data_point: DataPoint | None = None
+        self.previous_transmission: Comm | None = None
+        self.finished = False
+
+    def log(self, message: str):
+        line = f"[{self.clock.get_formatted_sidereal_time()}] {message}"
+        print(line, flush=True)
+        if self.log_file is not None:
+            self.log_file.write(line + "\n")
+            self.log_file.flush()
+
+    def alert(self, *messages: str):
+        """Tell the operator what to do, and wait for them to do it"""
+        if self.obs is not None:
+            self.obs.flush_files()  # Nothing is written while the prompt waits
+        for message in messages:
+            self.log(message)
+            if not self.unattended:
+                input("Press Enter when done...")
+        # Whatever was acquired while waiting belongs to neither state
+        self.data_feed.poll()
+
+    def run(self, obs: Observation):
+        self.obs = obs
+        obs.set_clock(self.clock)
+        self.data_timer = self.clock.add_timer(
+            1000 / obs.freq, self.update_data, name="update_data"
+        )
+        self.clock.add_timer(self.PROGRESS_PERIOD, self.log_progress, name="progress")
+
+        self.tars.start()
+        self.minitars.start()
+        self.acquisition.start()
+        if obs.raw_capture:
+            self.raw_capture = RawCapture(obs.name + "_raw.bin", self.samples)
+            self.raw_capture.start()
+        self.log(f"Running {obs.obs_type.name.lower()} '{obs.name}'")
+
+        try:
+            while not self.finished:
+                due = self.clock.next_due()
+                time.sleep(due if due is not None else 0.1)
+                self.tick()
+        except KeyboardInterrupt:
+            self.log("Interrupted; keeping what has been observed so far")
+            obs.close_file()
+        finally:
+            if self.raw_capture is not None:
+                self.raw_capture.stop()
+                self.log(f"Captured {self.raw_capture.samples_written} raw samples")
+            self.acquisition.stop()
+            self.tars.stop()
+            self.minitars.stop()
+
+    def tick(self):
+        self.check_acquisition()
+        if self.finished:
+            return
+        rows = self.data_feed.poll()
+        if len(rows) > 0:
+            row = rows[-1]
+            self.current_data_point = DataPoint(row[TIME], row[DEC], row[A], row[B])
+            assert self.obs is not None
+            self.obs.accumulate(rows)
+        self.clock.run_timers()
+
+    def check_acquisition(self):
+        """Log acquisition errors, and stop observing if acquisition has given up"""
+        error = self.acquisition.take_error()
+        if error is None:
+            return
+        if self.acquisition.failed:
+            self.log(f"Acquisition stopped: {error!r}; keeping what was observed")
+            assert self.obs is not None
+            self.obs.close_file()
+            self.finished = True
+        else:
+            self.log(f"Acquisition error: {error!r}")
+
+    def update_data(self):
+        """Threepio.update_data, with prompts on the console instead of alerts"""
+        assert self.obs is not None
+        self.data_timer.set_period(1000 / self.obs.freq)
+        if self.current_data_point is None:
+            return
+
+        transmission = self.obs.communicate(
+            self.current_data_point, self.clock.get_time()
+        )
+        obs_type = self.obs.obs_type.name.lower()
+
+        if transmission != self.previous_transmission:
+            if transmission is Comm.START_CAL:
+                prompts = ["Turn the calibration switches ON"]
+                if self.obs.state.name == "DATA":  # The second calibration
+                    if self.obs.obs_type is ObsType.SURVEY:
+                        prompts.insert(0, "STOP the telescope")
+                    elif self.obs.obs_type is ObsType.SPECTRUM:
+                        prompts.insert(0, "Set frequency to 1319.5MHz")
+                self.alert(*prompts)
+                self.clock.reset_anchor_time()
+                self.obs.next()
+                self.log("Taking calibration data")
+            elif transmission is Comm.START_BG:
+                self.alert("Turn the calibration switches OFF")
+                self.clock.reset_anchor_time()
+                self.obs.next()
+                self.log("Taking background data")
+            elif transmission is Comm.SEND_TEL_NORTH:
+                self.log("Send telescope NORTH at max speed")
+            elif transmission is Comm.SEND_TEL_SOUTH:
+                self.log("Send telescope SOUTH at max speed")
+            elif transmission is Comm.END_SEND_TEL:
+                self.log(f"Taking {obs_type} data, sweep {self.obs.sweep_number}")
+            elif transmission is Comm.FINISH_SWEEP:
+                self.log("Finishing last sweep")
+
+        if transmission is Comm.START_WAIT:
+            self.obs.next()
+            self.log(f"Waiting for {obs_type} to begin...")
+        elif transmission is Comm.START_DATA:
+            self.obs.next()
+            self.log(f"Taking {obs_type} data")
+        elif transmission is Comm.NEXT:
+            self.obs.next()
+        elif transmission is Comm.FINISHED:
+            self.obs.next()
+            self.log(f"{obs_type.capitalize()} complete")
+            if self.obs.writer is not None:
+                self.log(f"Writer: {self.obs.writer.get_report()}")
+            self.finished = True
+
+        self.previous_transmission = transmission
+
+    def log_progress(self):
+        assert self.obs is not None
+        _, end = self.obs.state_time_interval
+        remaining = end - self.clock.get_time()
+        message = f"{self.obs.state.name}"
+        if end > 0:
+            message += f", {remaining:+.0f}s until the next step"
+        if self.current_data_point is not None:
+            point = self.current_data_point
+            message += f"; dec {point.dec:.2f}, A {point.a:.4f}V, B {point.b:.4f}V"
+        self.log(message)
+
+
+def observation_times(clock: SuperClock, start: str, end: str) -> tuple[float, float]:
+    """Epoch start and end times of an observation between two sidereal times
+    (HH:MM:SS), the same way the new observation dialog works them out"""
+    starting_ra = SuperClock.deformat_time_string(start)
+    ending_ra = SuperClock.deformat_time_string(end)
+    if ending_ra < starting_ra:
+        ending_ra += 3600 * 24  # The next day
+
+    solar = clock.get_starting_epoch_time()
+    sidereal = clock.get_starting_sidereal_time()
+    return (
+        solar + SuperClock.sidereal_to_solar(starting_ra - sidereal),
+        solar + SuperClock.sidereal_to_solar(ending_ra - sidereal),
+    )
+
+
+def make_observation(args, clock: SuperClock) -> Observation:
+    obs = OBSERVATIONS[args.type]()
+    obs.set_raw_capture(args.raw_capture)
+    obs.set_async_writes(not args.sync_writes)
+    obs.set_binary(args.binary)
+    obs.set_integration(not args.no_integrate, args.integration_stats)
+    obs.set_decimation(Tars.SAMPLE_RATE if args.decimate else None)
+    obs.set_name(args.name or clock.get_time_slug())
+
+    start_time, end_time = observation_times(clock, args.start, args.end)
+    if obs.obs_type is ObsType.SPECTRUM:
+        end_time = start_time + 180
+    obs.set_start_and_end_times(start_time, end_time)
+    min_dec, max_dec = args.dec if len(args.dec) == 2 else args.dec * 2
+    obs.set_dec(min_dec, max_dec)
+    if args.data_freq is not None:
+        obs.set_data_freq(args.data_freq)
+    return obs
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run an observation without the GUI")
+    parser.add_argument(
+        "--config", help="JSON file of defaults for any option below, by long name"
+    )
+    parser.add_argument(
+        "type", nargs="?", choices=OBSERVATIONS, help="type of observation"
+    )
+    parser.add_argument("--start", help="sidereal start, HH:MM:SS")
+    parser.add_argument("--end", help="sidereal end, HH:MM:SS")
+    parser.add_argument("--dec", type=float, nargs="+", help="dec, or min & max dec")
+    parser.add_argument("--name", help="file name (defaults to a time slug)")
+    parser.add_argument("--data-freq", type=int, help="data sampling frequency (Hz)")
+    parser.add_argument("--binary", action="store_true", help="also write .mdb1/2")
+    parser.add_argument("--raw-capture", action="store_true", help="keep raw samples")
+    parser.add_argument("--decimate", action="store_true", help="filter, not average")
+    parser.add_argument("--no-integrate", action="store_true", help="write latest")
+    parser.add_argument("--integration-stats", action="store_true")
+    parser.add_argument("--sync-writes", action="store_true", help="no writer thread")
+    parser.add_argument(
+        "--unattended", action="store_true", help="don't wait for Enter at prompts"
+    )
+    parser.add_argument("--log", help="also append progress to this file")
+    parser.add_argument(
+        "--virtual",
+        action="store_true",
+        help="fast-forward a simulated observation in virtual time",
+    )
+
+    config, _ = parser.parse_known_args(argv)
+    if config.config is not None:
+        with open(config.config) as f:
+            defaults = {key.replace("-", "_"): v for key, v in json.load(f).items()}
+        parser.set_defaults(**defaults)
+    args = parser.parse_args(argv)
+
+    for name in ["type", "start", "end", "dec"]:
+        if getattr(args, name) is None:
+            parser.error(f"{name} is required, on the command line or in the config")
+    if not isinstance(args.dec, list):
+        args.dec = [args.dec]
+    if not 1 <= len(args.dec) <= 2:
+        parser.error("--dec takes one or two values")
+    return args
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.virtual:
+        clock = SuperClock()
+        clock = VirtualClock(clock.get_time(), clock.get_sidereal_seconds())
+        obs = make_observation(args, clock)
+        began, started = clock.get_time(), time.perf_counter()
+        simulation = Simulation(obs, clock)
+        previous = None
+        for event_time, comm in simulation.run():
+            if comm is not previous and comm is not Comm.BEEP:
+                print(f"{event_time - began:12.1f}s {comm.name}")
+            previous = comm
+        print(
+            f"Simulated {simulation.samples} samples in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+        return
+
+    headless = Headless(unattended=args.unattended, log_file=args.log)
+    headless.run(make_observation(args, headless.clock))
+
+
+if __name__ == "__main__":
+    main()
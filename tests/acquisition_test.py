@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+
+from tools import Acquisition, SampleRing, VirtualClock, A
+
+
+class FlakyTars:
+    """A DATAQ whose reads fail while 'failing', like a pulled USB cable"""
+
+    SAMPLE_RATE = 100
+
+    def __init__(self):
+        self.failing = False
+
+    def read_block(self):
+        if self.failing:
+            raise OSError(5, "Input/output error")
+        return np.array([[1.0, 2.0]])
+
+
+class Declinometer:
+    def read_latest(self):
+        return 0.0
+
+
+class DecCalc:
+    def calculate_declination(self, raw_dec):
+        return raw_dec
+
+
+def acquisition(tars):
+    return Acquisition(
+        tars, Declinometer(), DecCalc(), VirtualClock(1_700_000_000.0), SampleRing(8)
+    )
+
+
+def test_failed_polls_are_reported_and_retried():
+    tars = FlakyTars()
+    acq = acquisition(tars)
+    acq.POLL_PERIOD = 0.001
+    acq.MAX_FAILURES = 10**9  # Never give up
+    feed = acq.ring.subscribe()
+
+    tars.failing = True
+    acq.start()
+    error = None
+    while error is None:
+        error = acq.take_error()
+    tars.failing = False
+    assert isinstance(error, OSError)
+
+    deadline = time.monotonic() + 5
+    while len(rows := feed.poll()) == 0 and time.monotonic() < deadline:
+        pass  # Carries on once the device is back
+    acq.stop()
+    assert rows[-1, A] == 1.0
+    assert not acq.failed
+
+
+def test_gives_up_after_max_failures():
+    tars = FlakyTars()
+    tars.failing = True
+    acq = acquisition(tars)
+    acq.POLL_PERIOD = 0
+    acq.start()
+    acq.join(timeout=5)
+
+    assert not acq.is_alive() and acq.failed
+    assert "Input/output error" in str(acq.take_error())
+    assert acq.take_error() is None  # Taken
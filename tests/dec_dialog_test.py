@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+
+import numpy as np
+from PyQt5 import QtWidgets
+
+from dialogs import DecDialog
+from tools import SampleRing, RAW_DEC
+from _tools.samplering import COLUMNS
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+class Acquisition(threading.Thread):
+    """Publishes one sample at 'value' after 'delay' seconds, then idles"""
+
+    POLL_PERIOD = 0.01
+
+    def __init__(self, ring: SampleRing, value: float, delay: float):
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.value = value
+        self.delay = delay
+
+    def run(self):
+        time.sleep(self.delay)
+        row = np.zeros((1, COLUMNS))
+        row[0, RAW_DEC] = self.value
+        self.ring.push(row)
+        time.sleep(self.delay)
+
+
+class Threepio:
+    def beep(self, message=""):
+        pass
+
+
+def stale_ring() -> SampleRing:
+    ring = SampleRing(8)
+    row = np.zeros((1, COLUMNS))
+    row[0, RAW_DEC] = 1.0  # From before the dish was moved
+    ring.push(row)
+    return ring
+
+
+def test_record_waits_for_a_fresh_sample():
+    acquisition = Acquisition(stale_ring(), 2.0, delay=0.1)
+    dialog = DecDialog(acquisition, Threepio())
+    first = dialog.current_dec
+    acquisition.start()
+    dialog.handle_record()
+
+    assert dialog.data[first] == 2.0
+    assert dialog.current_dec == first + dialog.step
+
+
+def test_record_without_acquisition_shows_an_error():
+    acquisition = Acquisition(stale_ring(), 2.0, delay=0.1)  # Never started
+    dialog = DecDialog(acquisition, Threepio())
+    first = dialog.current_dec
+    started = time.monotonic()
+    dialog.handle_record()
+
+    assert time.monotonic() - started < dialog.SAMPLE_TIMEOUT
+    assert dialog.data[first] is None and dialog.current_dec == first
+    assert not dialog.ui.warning_label.isHidden()
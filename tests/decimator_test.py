@@ -0,0 +1,70 @@
+import numpy as np
+
+from tools import A, B, TIME, Decimator, Scan, VirtualClock
+from _tools.samplering import COLUMNS
+from _tools.observation import State
+
+
+def tone(rate, seconds, hz):
+    t = np.arange(0, seconds, 1 / rate)
+    a = 1 + np.sin(2 * np.pi * hz * t)
+    return np.column_stack([t, np.zeros_like(t), a, 2 + 0 * t])
+
+
+def test_output_rate_is_exact_and_aliases_are_removed():
+    samples = tone(100, 60, 40)  # 40 Hz would alias to 2 Hz at 6 Hz if picked
+    output = Decimator(100, 6, 8).process(samples)
+
+    assert abs(len(output) - 6 * 60) <= 6 * 8  # Less the filter warm-up
+    assert np.allclose(np.diff(output[:, 0]).mean(), 1 / 6, atol=1e-3)
+    assert np.allclose(output[:, 2], 1, atol=1e-3)
+    assert np.allclose(output[:, 3], 2)
+
+
+def test_block_boundaries_do_not_matter():
+    samples = tone(100, 20, 3)
+    whole = Decimator(100, 6, 8).process(samples)
+
+    decimator = Decimator(100, 6, 8)
+    pieces = [decimator.process(samples[i:i + 7]) for i in range(0, len(samples), 7)]
+
+    assert np.allclose(np.concatenate(pieces), whole)
+
+
+def step(rate, seconds, before, after):
+    """Samples at 'before' volts for 'seconds', then 'after' for as long again"""
+    t = np.arange(0, 2 * seconds, 1 / rate)
+    a = np.where(t < seconds, before, after)
+    return np.column_stack([t, np.zeros_like(t), a, a])
+
+
+def test_reset_keeps_a_step_out_of_what_follows():
+    samples = step(100, 20, 5, 1)
+    decimator = Decimator(100, 1, 8)
+    before = decimator.process(samples[:2000])
+    decimator.reset()
+    after = decimator.process(samples[2000:])
+
+    assert np.allclose(before[:, 2], 5)
+    assert np.allclose(after[:, 2], 1)  # Without the reset, 5 V for 4 seconds
+    assert after[0, 0] == samples[2000, 0]  # Resumes half a filter length in
+    assert len(after) == 20 - 4
+
+
+def test_state_changes_reset_the_filter(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    obs = Scan()
+    obs.set_name("obs")
+    obs.set_clock(VirtualClock(1_700_000_000.0))
+    obs.set_decimation(100)
+    steps = step(100, 60, 5, 1)  # Calibration noise on, then off
+    samples = np.zeros((len(steps), COLUMNS))  # As a SampleRing publishes them
+    samples[:, [TIME, A, B]] = steps[:, [0, 2, 3]]
+
+    obs.next(State.CAL_1)
+    obs.accumulate(samples[:6000])
+    obs.next(State.BG_1)
+    obs.accumulate(samples[6000:])
+
+    assert obs.filtered
+    assert np.allclose([point.a for point in obs.filtered], 1)
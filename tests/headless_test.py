@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import pytest
+
+import headless
+from tools import ObsType, SuperClock, VirtualClock, TIME
+from _tools.samplering import COLUMNS
+
+
+def test_config_supplies_defaults(tmp_path):
+    config = tmp_path / "crab.json"
+    config.write_text(json.dumps({"type": "survey", "dec": [10, 20], "binary": True}))
+    args = headless.parse_args(
+        ["--config", str(config), "--start", "05:00:00", "--end", "06:00:00"]
+    )
+    assert (args.type, args.dec, args.binary) == ("survey", [10, 20], True)
+
+    args = headless.parse_args(
+        ["scan", "--config", str(config), "--start", "1:0:0", "--end", "2:0:0"]
+        + ["--dec", "15"]
+    )
+    assert (args.type, args.dec) == ("scan", [15.0])  # The command line wins
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["scan", "--start", "05:00:00", "--end", "06:00:00"],  # No dec
+        ["scan", "--start", "05:00:00", "--end", "06:00:00", "--dec", "1", "2", "3"],
+    ],
+)
+def test_bad_arguments(argv):
+    with pytest.raises(SystemExit):
+        headless.parse_args(argv)
+
+
+def test_make_observation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clock = VirtualClock(1_700_000_000.0, sidereal_time=4 * 3600)
+    args = headless.parse_args(
+        ["spectrum", "--start", "05:00:00", "--end", "23:00:00", "--dec", "20"]
+        + ["--name", "sun", "--data-freq", "5"]
+    )
+    obs = headless.make_observation(args, clock)
+
+    assert obs.obs_type is ObsType.SPECTRUM and obs.name == "sun"
+    assert (obs.min_dec, obs.max_dec, obs.data_freq) == (20, 20, 5)
+    hour = SuperClock.sidereal_to_solar(3600)
+    assert obs.start_time == pytest.approx(clock.get_time() + hour)
+    assert obs.end_time == pytest.approx(obs.start_time + 180)  # Always 3 minutes
+
+
+def test_observation_times_wrap_past_midnight():
+    clock = VirtualClock(1_700_000_000.0, sidereal_time=23 * 3600)
+    start, end = headless.observation_times(clock, "23:30:00", "00:30:00")
+    assert end - start == pytest.approx(SuperClock.sidereal_to_solar(3600))
+
+
+def test_virtual_run(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    now = SuperClock().get_sidereal_seconds()
+    start, end = [
+        "%02d:%02d:%02d" % (t // 3600 % 24, t // 60 % 60, t % 60)
+        for t in (int(now) + 300, int(now) + 900)
+    ]
+    headless.main(["scan", "--start", start, "--end", end, "--dec", "20", "--virtual"])
+
+    output = capsys.readouterr().out
+    assert "START_DATA" in output and "FINISHED" in output
+    assert "Simulated" in output
+    assert (tmp_path / "data").is_dir()
+
+
+def test_samples_taken_during_a_prompt_are_dropped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = headless.Headless(unattended=False)
+    rows = np.zeros((500, COLUMNS))
+    rows[:, TIME] = np.arange(500)
+
+    def answer(prompt):
+        runner.samples.push(rows)  # The operator takes a while
+        return ""
+
+    monkeypatch.setattr("builtins.input", answer)
+    runner.alert("Turn the calibration switches ON")
+    assert runner.data_feed.pending == 0
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from tools import Integrator
+
+
+def test_mean_of_a_window():
+    integrator = Integrator()
+    for sample in [(10, 20, 1.0, 4.0), (11, 21, 2.0, 5.0), (12, 22, 6.0, 9.0)]:
+        integrator.add(*sample)
+
+    assert integrator.count == 3
+    point = integrator.mean()
+    assert point.timestamp == pytest.approx(11)  # The middle of the window
+    assert point.dec == pytest.approx(21)
+    assert point.a == pytest.approx(3)
+    assert point.b == pytest.approx(6)
+
+
+def test_blocks_match_single_samples():
+    rng = np.random.default_rng(4)
+    samples = rng.normal(1, 0.1, (4, 100))
+    one, block = Integrator(stats=True), Integrator(stats=True)
+    for sample in samples.T:
+        one.add(*sample)
+    block.add_block(*samples[:, :60])
+    block.add_block(*samples[:, 60:60])  # Empty
+    block.add_block(*samples[:, 60:])
+
+    assert block.count == one.count == 100
+    assert np.allclose(block.mean().to_tuple(), one.mean().to_tuple())
+    assert np.allclose(block.std(), one.std())
+    assert (block.min_a, block.max_b) == (one.min_a, one.max_b)
+    assert np.allclose(block.std(), samples[2:].std(axis=1))
+
+
+def test_reset_starts_a_new_window():
+    integrator = Integrator(stats=True)
+    integrator.add(0, 0, 100, 100)
+    integrator.reset()
+    assert integrator.count == 0
+
+    integrator.add(1, 2, 3, 4)
+    assert integrator.mean().to_tuple() == (1, 2, 3, 4)
+    assert (integrator.min_a, integrator.max_a) == (3, 3)
+    assert integrator.std() == (0, 0)
+
+
+def test_partial_window():
+    """Whatever has arrived so far is averaged, however few samples that is"""
+    integrator = Integrator()
+    integrator.add_block(*np.array([[5.0], [1.0], [2.0], [3.0]]))
+    assert integrator.mean().to_tuple() == (5, 1, 2, 3)
+    integrator.add(7, 1, 4, 5)
+    assert integrator.mean().to_tuple() == (6, 1, 3, 4)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from tools import BinaryPrecious, DataPoint, load_binary
+
+
+def write_survey(directory):
+    file = BinaryPrecious("survey.mdb2", str(directory))
+    file.write("* CAL_1")
+    file.write(DataPoint(1.5, 10, 0.25, 0.5))
+    file.write("* DATA")
+    for i in range(3):
+        file.write(DataPoint(2 + i, 11 + i, 1.0 + i, 2.0 + i))
+    file.write("* DATA")
+    file.write(DataPoint(5, 14, 4, 5))
+    file.write("* BG_2")  # Left empty, so dropped
+    file.write("TELESCOPE: The Mighty Forty")
+    return file
+
+
+def test_round_trip(tmp_path):
+    file = write_survey(tmp_path)
+    file.close()
+
+    with load_binary(str(tmp_path / "survey.mdb2")) as binary:
+        assert len(binary.records) == 5
+        assert list(binary.timestamp) == [1.5, 2, 3, 4, 5]
+        assert np.allclose(binary.dec, [10, 11, 12, 13, 14])
+        assert np.allclose(binary.a, [0.25, 1, 2, 3, 4])
+        assert np.allclose(binary.b, [0.5, 2, 3, 4, 5])
+
+        assert [(s["label"], s["start"], s["count"]) for s in binary.segments] == [
+            ("CAL_1", 0, 1),
+            ("DATA", 1, 3),
+            ("DATA", 4, 1),
+        ]
+        assert binary.segments[1]["end_time"] == 4
+        assert list(binary.segment("CAL_1")["timestamp"]) == [1.5]
+        assert [len(sweep) for sweep in binary.sweeps()] == [3, 1]
+        assert binary.meta == {"TELESCOPE": "The Mighty Forty"}
+        kept = binary.segment(1).copy()
+    assert binary.closed and len(binary.records) == 0
+    assert list(kept["a"]) == [1, 2, 3]
+
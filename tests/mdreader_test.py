@@ -0,0 +1,113 @@
+import io
+import os
+import time
+
+import numpy as np
+
+from tools import Comm, DataPoint, Scan, Survey, read_meta, read_segments, read_segment
+from tools import find_segments, read_indexed_segment
+from _tools import precious
+
+
+def segment_offsets(path: str) -> list[tuple[int, int]]:
+    """Byte range of the values of each non-empty segment, from the file itself"""
+    segments, start, offset = [], 0, 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip() == b"*":
+                if offset > start:
+                    segments.append((start, offset))
+                start = offset + len(line)
+            offset += len(line)
+    return segments
+
+
+def test_survey_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    survey = Survey()
+    survey.set_name("survey")
+    now = time.time()
+    survey.set_start_and_end_times(now, now + 100)
+    survey.set_dec(10, 20)
+
+    survey.next()  # CAL_1
+    survey.write_point(DataPoint(1, 0, 3, 4))
+    survey.next()  # BG_1
+    survey.write_point(DataPoint(2, 0, 3, 4))
+    survey.next()  # WAITING
+    survey.next()  # DATA
+    sweeps = [
+        (DataPoint(3, 12, 3, 4), Comm.END_SEND_TEL),  # Into the range
+        (DataPoint(4, 13, 3, 4), Comm.NO_ACTION),
+        (DataPoint(5, 25, 3, 4), Comm.SEND_TEL_SOUTH),  # Out the top
+        (DataPoint(6, 19, 3, 4), Comm.END_SEND_TEL),  # And back in
+        (DataPoint(7, 18, 3, 4), Comm.NO_ACTION),
+        (DataPoint(8, 16, 3, 4), Comm.NO_ACTION),
+    ]
+    for point, comm in sweeps:
+        assert survey.data_logic(point) is comm
+    survey.next()  # CAL_2
+    survey.write_point(DataPoint(9, 0, 3, 4))
+    survey.next()  # BG_2
+    survey.write_point(DataPoint(10, 0, 3, 4))
+    survey.next()  # DONE
+
+    path = os.path.join("data", "survey_a.md2")
+    chunks = list(read_segments(path, chunk_size=1))
+    assert [(c.label, c.index) for c in chunks] == [
+        ("CAL_1", 0),
+        ("BG_1", 1),
+        ("DATA", 2),
+        ("DATA", 3),
+        ("DATA", 3),
+        ("CAL_2", 4),
+        ("BG_2", 5),
+    ]
+    assert [c.data[0, 0] for c in chunks] == [1, 2, 4, 7, 8, 9, 10]
+    assert chunks[0].data.shape == (1, 3)
+    assert read_meta(path)["TELESCOPE"] == "The Mighty Forty"
+
+    index = find_segments(path)
+    assert [(e["label"], e["sweep"], e["points"]) for e in index] == [
+        ("CAL_1", -1, 1),
+        ("BG_1", -1, 1),
+        ("DATA", 1, 1),
+        ("DATA", 2, 2),
+        ("CAL_2", -1, 1),
+        ("BG_2", -1, 1),
+    ]
+    offsets = [tuple(e["offsets"]["survey_a.md2"]) for e in index]
+    assert offsets == segment_offsets(path)
+    for sweep, times in [(1, [4]), (2, [7, 8])]:
+        (entry,) = find_segments(path, label="DATA", sweep=sweep)
+        assert list(read_indexed_segment(path, entry)[:, 0]) == times
+
+
+def test_index_offsets_hold_with_windows_newlines(tmp_path, monkeypatch):
+    def windows_open(file, mode="r", newline=None, **kwargs):
+        """Text mode as on Windows, where '\n' is written as '\r\n' by default"""
+        newline = "\r\n" if newline is None and "b" not in mode else newline
+        return io.open(file, mode, newline=newline, **kwargs)
+
+    monkeypatch.setattr(precious, "open", windows_open, raising=False)
+    monkeypatch.chdir(tmp_path)
+    scan = Scan()
+    scan.set_name("scan")
+    now = time.time()
+    scan.set_start_and_end_times(now, now + 100)
+    scan.set_dec(10, 20)
+
+    for state in range(5):
+        scan.next()
+        if state == 2:
+            scan.next()  # WAITING to DATA
+        for i in range(50):
+            scan.write_point(DataPoint(100 * state + i, 15, 1 + i / 100, 2))
+    scan.next()  # DONE
+
+    path = os.path.join("data", "scan_a.md1")
+    with open(path, "rb") as f:
+        assert b"\r" not in f.read()
+    for entry in find_segments(path):
+        expected = read_segment(path, entry["label"])
+        assert np.array_equal(read_indexed_segment(path, entry), expected)
@@ -1,30 +1,88 @@
+import os
 import time
 
-from tools import Scan, Survey, Spectrum, DataPoint
+import pytest
 
+from tools import Comm, Scan, Survey, Spectrum, DataPoint, ObsType, VirtualClock
+from tools import MyPrecious
+from _tools.observation import State
 
-def test1():
-    scan = Scan()
-    scan.set_name("scan")
 
-    survey = Survey()
-    survey.set_name("survey")
+@pytest.mark.parametrize("kind", [Scan, Survey, Spectrum])
+def test_states_follow_the_clock(tmp_path, monkeypatch, kind):
+    monkeypatch.chdir(tmp_path)
+    obs = kind()
+    obs.set_name("obs")
+    clock = VirtualClock(1_700_000_000.0)
+    obs.set_clock(clock)
 
-    spectrum = Spectrum()
-    spectrum.set_name("spectrum")
+    lead = obs.cal_dur + obs.bg_dur + 30  # Before the start, for the operator
+    start = clock.get_time() + lead + 10
+    obs.set_start_and_end_times(start, start + 100)
+    obs.set_dec(15, 25)
+    inside, outside = DataPoint(0, 20, 1, 2), DataPoint(0, 10, 1, 2)
 
-    baseline = time.time()
-    timestamps = [-130, -65, 0, 105, 170, 235]
-    datapoint = DataPoint(baseline % 86400, 1, 2, 45)
+    def step(seconds, point=inside):
+        clock.advance(seconds)
+        return obs.communicate(point, clock.get_time())
 
-    for obs in [scan, survey, spectrum]:
-        obs.set_ra(baseline, baseline + 100)
-        obs.set_dec(60, 30)
-        obs.set_data_freq(10)
+    assert step(0) is Comm.NO_ACTION
+    assert step(10) is Comm.START_CAL
+    assert obs.next() is State.CAL_1
+    assert step(obs.cal_dur / 2) is Comm.NO_ACTION
+    assert step(obs.cal_dur / 2) is Comm.START_BG
+    assert obs.next() is State.BG_1
+    assert step(obs.bg_dur) is Comm.START_WAIT
+    assert obs.next() is State.WAITING
+    assert step(0) is Comm.START_DATA  # Calibration counts as the start
+    assert obs.next() is State.DATA
+    assert step(100) is not Comm.START_CAL  # Still before the end
+    assert step(30, outside) is Comm.START_CAL  # A survey must be off the edge
+    assert obs.next() is State.CAL_2
+    assert step(obs.cal_dur) is Comm.START_BG
+    assert obs.next() is State.BG_2
+    assert step(obs.bg_dur) is Comm.FINISHED
+    assert obs.next() is State.DONE
 
-        print("-----" + obs.name + "-----")
-        for i in range(6):
-            print(obs.communicate(datapoint, timestamps[i]))
-            print(obs.state)
-            obs.next()
-        print(obs.state)
+    with open(os.path.join("data", "obs_a" + obs.file_extension)) as f:
+        lines = f.read().splitlines()
+    ends_sweep = obs.obs_type is ObsType.SURVEY  # By leaving the range
+    assert lines.count("*") == 6 + ends_sweep  # 4 between states, 2 before the meta
+
+
+@pytest.mark.parametrize("async_writes", [False, True])
+def test_values_are_flushed_while_nothing_is_written(
+    tmp_path, monkeypatch, async_writes
+):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    monkeypatch.chdir(tmp_path)
+    obs = Scan()
+    obs.set_async_writes(async_writes)
+    obs.set_name("obs")
+    clock = VirtualClock(1_700_000_000.0)
+    obs.set_clock(clock)
+    obs.set_start_and_end_times(clock.get_time() + 3600, clock.get_time() + 7200)
+    path = os.path.join("data", "obs_a" + obs.file_extension)
+
+    def flushed(expected):
+        """The file once it holds 'expected', or as it is after a moment"""
+        deadline = time.perf_counter() + (0.5 if async_writes else 0)
+        while True:
+            lines = []
+            if os.path.exists(path):
+                with open(path) as f:
+                    lines = f.read().splitlines()
+            if lines == expected or time.perf_counter() > deadline:
+                return lines
+
+    obs.next(State.BG_1)
+    obs.write_point(DataPoint(1, 20, 1, 2))
+    obs.next(State.WAITING)  # Nothing more to write until the data starts
+    assert obs.communicate(DataPoint(2, 20, 1, 2), clock.get_time()) is Comm.NO_ACTION
+    point = ["1.00", "20.0000", "1.0000"]
+    assert flushed(point) == []
+    now[0] += MyPrecious.FLUSH_SECONDS
+    obs.communicate(DataPoint(3, 20, 1, 2), clock.get_time())
+    assert flushed(point) == point
+    obs.close_file()
@@ -0,0 +1,101 @@
+import os
+import time
+
+from tools import MyPrecious
+
+
+def contents(directory, name="file.md1"):
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_flushes_every_flush_count_values(tmp_path):
+    file = MyPrecious("file.md1", str(tmp_path), flush_count=3, durable=False)
+    file.write("1")
+    file.write("2")
+    assert contents(tmp_path) == []
+    file.write("3")
+    assert contents(tmp_path) == ["1", "2", "3"]
+    file.write("4")
+    assert contents(tmp_path) == ["1", "2", "3"]
+    file.close()
+    assert contents(tmp_path) == ["1", "2", "3", "4"]
+
+
+def test_flushes_once_flush_bytes_are_buffered(tmp_path):
+    file = MyPrecious("file.md1", str(tmp_path), flush_bytes=10, durable=False)
+    file.write("1.25")  # 5 bytes with the newline
+    assert contents(tmp_path) == []
+    file.write("2.50")
+    assert contents(tmp_path) == ["1.25", "2.50"]
+    file.close()
+
+
+def test_flushes_when_the_last_flush_is_old(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    file = MyPrecious("file.md1", str(tmp_path), flush_seconds=1, durable=False)
+    file.write("1")
+    now[0] += 0.5
+    file.write("2")
+    assert contents(tmp_path) == []
+    now[0] += 0.5
+    file.write("3")
+    assert contents(tmp_path) == ["1", "2", "3"]
+    file.close()
+
+
+def test_values_are_flushed_when_due_without_another_write(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    file = MyPrecious("file.md1", str(tmp_path), flush_seconds=1, durable=False)
+    file.write("1")
+    file.flush_if_due()
+    assert contents(tmp_path) == []  # Not yet due
+    now[0] += 1
+    file.flush_if_due()
+    assert contents(tmp_path) == ["1"]
+    file.close()
+
+
+def test_durable_files_sync_at_markers_and_close(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd))
+    file = MyPrecious("file.md1", str(tmp_path))
+    file.write("1")
+    assert contents(tmp_path) == [] and synced == []
+    file.write("*")
+    assert contents(tmp_path) == ["1", "*"] and len(synced) == 1
+    file.write("2")
+    file.close()
+    assert contents(tmp_path) == ["1", "*", "2"] and len(synced) == 2
+    assert file.closed
+
+    file.write("3")  # Ignored once closed
+    file.flush()
+    assert contents(tmp_path) == ["1", "*", "2"]
+
+
+def test_markers_are_ordinary_values_when_not_durable(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd))
+    file = MyPrecious("file.md1", str(tmp_path), durable=False)
+    file.write("1")
+    file.write("*")
+    assert contents(tmp_path) == []
+    file.close()
+    assert contents(tmp_path) == ["1", "*"] and synced == []
+
+
+def test_unwritten_file_is_never_created(tmp_path):
+    directory = tmp_path / "data"
+    file = MyPrecious("file.md1", str(directory))
+    file.flush()
+    file.sync()
+    file.close()
+
+    assert not file.created
+    assert not directory.exists()
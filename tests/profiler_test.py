@@ -0,0 +1,25 @@
+from tools import Histogram, Profiler
+
+
+def test_percentiles_within_a_bucket():
+    histogram = Histogram()
+    for i in range(1, 1001):
+        histogram.add(i * 1e-5)  # 10us to 10ms
+
+    assert histogram.count == 1000
+    assert histogram.max == 1e-2
+    for percent, exact in [(50, 5e-3), (95, 9.5e-3), (99, 9.9e-3)]:
+        assert exact <= histogram.percentile(percent) <= exact * 1.13
+
+
+def test_disabled_profiler_leaves_functions_alone():
+    def f(x):
+        return x + 1
+
+    assert Profiler(enabled=False).wrap("f", f) is f
+
+    profiler = Profiler()
+    timed = profiler.wrap("f", f)
+    assert [timed(1), timed(2)] == [2, 3]
+    assert profiler.stages["f"].count == 2
+    assert profiler.get_report().splitlines()[1].split()[:2] == ["f", "2"]
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from tools import RawCapture, SampleRing, load_raw_capture, TIME, RAW_DEC, DEC, A, B
+from _tools.samplering import COLUMNS
+
+
+def rows(start, stop):
+    r = np.zeros((stop - start, COLUMNS))
+    r[:, TIME] = np.arange(start, stop) + 0.5
+    r[:, RAW_DEC] = 0.25
+    r[:, DEC] = 20
+    r[:, A] = 1
+    r[:, B] = 2
+    return r
+
+
+def test_capture_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(RawCapture, "WRITE_PERIOD", 0.01)
+    ring = SampleRing(1000)
+    ring.push(rows(0, 10))  # Before the capture starts, so not captured
+    capture = RawCapture("raw.bin", ring, str(tmp_path))
+    capture.start()
+    for i in range(10, 100, 10):
+        ring.push(rows(i, i + 10))
+    capture.stop()
+
+    assert capture.file.closed and not capture.is_alive()
+    assert capture.samples_written == 90
+    records = load_raw_capture(str(tmp_path / "raw.bin"))
+    assert list(records["timestamp"]) == list(np.arange(10, 100) + 0.5)
+    assert set(records["raw_dec"]) == {0.25}
+    assert set(records["dec"]) == {20}
+    assert (set(records["a"]), set(records["b"])) == ({1}, {2})
+
+
+def test_stop_without_start_writes_and_closes(tmp_path):
+    ring = SampleRing(100)
+    capture = RawCapture("raw.bin", ring, str(tmp_path))
+    ring.push(rows(0, 5))
+    capture.stop()
+
+    assert capture.file.closed
+    assert len(load_raw_capture(str(tmp_path / "raw.bin"))) == 5
+    capture.stop()  # Twice is harmless
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a capture")
+    with pytest.raises(ValueError):
+        load_raw_capture(str(path))
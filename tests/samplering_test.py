@@ -0,0 +1,86 @@
+import numpy as np
+
+from tools import SampleRing, TIME
+
+
+def rows(start, stop):
+    r = np.zeros((stop - start, 5))
+    r[:, TIME] = np.arange(start, stop)
+    return r
+
+
+def test_read_since_wraps_around():
+    ring = SampleRing(8)
+    ring.push(rows(0, 6))
+    _, cursor = ring.read_since(0)
+    ring.push(rows(6, 11))
+
+    new, cursor = ring.read_since(cursor)
+    assert cursor == 11
+    assert list(new[:, TIME]) == [6, 7, 8, 9, 10]
+    assert ring.latest()[TIME] == 10
+
+
+def test_slow_reader_skips_to_oldest_kept():
+    ring = SampleRing(4)
+    for i in range(10):
+        ring.push(rows(i, i + 1))
+
+    new, cursor = ring.read_since(0)
+    assert cursor == 10
+    assert list(new[:, TIME]) == [6, 7, 8, 9]
+
+
+def test_windows_of_held_rows():
+    ring = SampleRing(8)
+    ring.push(rows(0, 12))
+
+    assert len(ring) == 8
+    assert list(ring.last(3)[:, TIME]) == [9, 10, 11]
+    assert list(ring.last(20)[:, TIME]) == list(range(4, 12))
+    assert list(ring.since(6.5)[:, TIME]) == [7, 8, 9, 10, 11]
+    assert list(ring.since(0)[:, TIME]) == list(range(4, 12))
+    assert len(ring.since(12)) == 0
+
+
+def test_subscriptions_are_independent():
+    ring = SampleRing(4)
+    fast = ring.subscribe()
+    ring.push(rows(0, 3))
+    slow = ring.subscribe(from_start=True)
+
+    assert list(fast.poll()[:, TIME]) == [0, 1, 2]
+    assert len(fast.poll()) == 0  # Nothing is received twice
+
+    ring.push(rows(3, 7))
+    assert list(fast.poll()[:, TIME]) == [3, 4, 5, 6]
+    assert fast.dropped == 0
+    assert list(slow.poll()[:, TIME]) == [3, 4, 5, 6]
+    assert slow.dropped == 3
+    assert slow.cursor == fast.cursor == 7
+
+
+def test_oversized_push_counts_every_row():
+    ring = SampleRing(4)
+    subscription = ring.subscribe()
+    ring.push(rows(0, 10))
+
+    assert ring.head == 10
+    assert list(ring.last(4)[:, TIME]) == [6, 7, 8, 9]
+    assert list(subscription.poll()[:, TIME]) == [6, 7, 8, 9]
+    assert subscription.dropped == 6
+    ring.push(rows(10, 11))
+    assert list(ring.last(2)[:, TIME]) == [9, 10]
+
+
+def test_rows_being_overwritten_are_not_returned():
+    ring = SampleRing(8)
+    ring.push(rows(0, 8))
+
+    # The producer is partway through pushing rows 8 and 9 over rows 0 and 1
+    ring.writing = 10
+    ring.buffer[0, TIME] = 8
+    new, cursor = ring.read_since(0)
+
+    assert cursor == 8
+    assert list(new[:, TIME]) == [2, 3, 4, 5, 6, 7]
@@ -0,0 +1,62 @@
+import os
+import time
+
+from tools import Comm, Scan, Simulation, Spectrum, Survey, VirtualClock
+from tools import read_segments
+from _tools.observation import State
+
+
+def simulate(obs, name, duration):
+    clock = VirtualClock(1_700_000_000.0, sidereal_time=5 * 3600)
+    start = clock.get_time() + 300
+    obs.set_name(name)
+    obs.set_start_and_end_times(start, start + duration)
+    obs.set_dec(15, 25)
+    obs.set_async_writes(True)
+    simulation = Simulation(obs, clock)
+    return simulation, [comm for _, comm in simulation.run()]
+
+
+def test_scan_runs_to_completion(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    started = time.perf_counter()
+    simulation, comms = simulate(Scan(), "scan", 3600)
+
+    assert time.perf_counter() - started < 30  # An hour of data, much faster
+    assert simulation.finished and simulation.obs.state is State.DONE
+    transitions = [c for i, c in enumerate(comms) if i == 0 or c != comms[i - 1]]
+    assert transitions == [
+        Comm.START_CAL,
+        Comm.START_BG,
+        Comm.START_WAIT,
+        Comm.START_DATA,
+        Comm.START_CAL,
+        Comm.START_BG,
+        Comm.FINISHED,
+    ]
+
+    labels = {c.label for c in read_segments(os.path.join("data", "scan_a.md1"))}
+    assert labels == {"CAL_1", "BG_1", "DATA", "CAL_2", "BG_2"}
+
+
+def test_survey_sweeps_back_and_forth(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    simulation, comms = simulate(Survey(), "survey", 600)
+
+    assert simulation.finished
+    assert Comm.SEND_TEL_NORTH in comms and Comm.SEND_TEL_SOUTH in comms
+    assert simulation.obs.sweep_number > 5
+    sweeps = {
+        c.index
+        for c in read_segments(os.path.join("data", "survey_a.md2"))
+        if c.label == "DATA"
+    }
+    assert len(sweeps) > 5
+
+
+def test_spectrum_steps_frequency(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    simulation, comms = simulate(Spectrum(), "spectrum", 180)
+
+    assert simulation.finished
+    assert comms.count(Comm.BEEP) > 100
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+from PyQt5 import QtChart, QtWidgets
+
+from tools import Stripchart, minmax_envelope, TIME, A, B
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def rows(start, stop):
+    r = np.zeros((stop - start, 5))
+    r[:, TIME] = np.arange(start, stop)
+    r[:, A] = 1
+    r[:, B] = 2
+    return r
+
+
+def test_draw_trims_old_points_by_index():
+    stripchart = Stripchart(QtChart.QChart(), (0x2196F3, 0xFF5252))
+    for i in range(0, 10000, 100):  # Enough to grow and compact the buffers
+        stripchart.add(rows(i, i + 100))
+        stripchart.draw(i + 99, 50)
+
+    assert len(stripchart) == 52  # One point beyond the edge
+    a, b = stripchart.series
+    assert a.count() == b.count() == 52
+    assert (a.at(0).x(), a.at(0).y()) == (1, 9948)
+    assert (b.at(51).x(), b.at(51).y()) == (2, 9999)
+    assert (stripchart.axis_y.min(), stripchart.axis_y.max()) == (9949, 9999)
+
+
+def test_clear():
+    stripchart = Stripchart(QtChart.QChart(), (0x2196F3, 0xFF5252))
+    stripchart.add(rows(0, 10))
+    stripchart.clear()
+    stripchart.draw(10, 50)
+    assert stripchart.series[0].count() == 0
+
+
+def test_envelope_keeps_spikes():
+    times = np.arange(10000.0)
+    values = np.zeros(10000)
+    values[1234] = 5
+    values[8765] = -3
+
+    t, v = minmax_envelope(times, values, 100)
+    assert len(t) == len(v) == 200
+    assert np.all(np.diff(t) >= 0)
+    assert (t[0], t[-1]) == (0, 9999)
+    assert v.max() == 5 and v.min() == -3
+
+    t, v = minmax_envelope(times[:150], values[:150], 100)
+    assert len(t) == 150  # Already short enough
+
+
+def test_voltages_land_on_the_chart():
+    view = QtChart.QChartView()
+    view.resize(300, 400)
+    stripchart = Stripchart(view.chart(), (0x2196F3, 0xFF5252))
+    r = rows(0, 100)
+    r[:, A] = np.linspace(4.9, 5.1, 100)  # Real DAQ voltages, far from 0..1
+    r[:, B] = 5
+    stripchart.add(r)
+    stripchart.draw(99, 100)
+    view.show()
+    app.processEvents()
+
+    plot = view.chart().plotArea()
+    for i in (0, 50, 99):
+        point = view.chart().mapToPosition(stripchart.series[0].at(i))
+        assert plot.adjusted(-1, -1, 1, 1).contains(point)
+
+    image = view.grab().toImage()
+    blue = sum(
+        image.pixelColor(x, y).blue() > 200 and image.pixelColor(x, y).red() < 100
+        for x in range(0, image.width(), 2)
+        for y in range(0, image.height(), 2)
+    )
+    assert blue > 0
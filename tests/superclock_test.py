@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from tools import SuperClock, local_sidereal_time, astropy_sidereal_time
+from tools import configure_iers
+
+
+def test_timers_run_from_the_schedule(monkeypatch):
+    clock = SuperClock()
+    now = [0.0]
+    monkeypatch.setattr(time, "perf_counter_ns", lambda: int(now[0] * 1e9))
+    clock.calibrate_sidereal_time(0)
+
+    runs = []
+    fast = clock.add_timer(100, lambda: runs.append("fast"))
+    slow = clock.add_timer(1000, lambda: runs.append("slow"))
+    assert abs(clock.next_due() - 0.1) < 1e-6
+
+    now[0] += 0.25
+    clock.run_timers()
+    assert runs == ["fast"]  # Once, however many periods were missed
+    assert abs(fast.lateness - 0.15) < 1e-6
+    assert abs(clock.next_due() - 0.05) < 1e-6  # Still in phase
+
+    fast.cancel()
+    now[0] += 1
+    clock.run_timers()
+    assert runs == ["fast", "slow"]
+    assert slow.runs == 1
+
+    slow.set_period(500)
+    assert abs(clock.next_due() - 0.5) < 1e-6
+    now[0] += 0.5
+    clock.run_timers()
+    assert runs == ["fast", "slow", "slow"]
+
+
+def test_wall_clock_steps_do_not_warp_time(monkeypatch):
+    clock = SuperClock()
+    counter = [5 * 10**9]
+    monkeypatch.setattr(time, "perf_counter_ns", lambda: counter[0])
+    clock.calibrate_sidereal_time(3600)
+    start = clock.get_time()
+
+    wall = time.time()
+    monkeypatch.setattr(time, "time", lambda: wall - 3600)  # The system clock steps
+    counter[0] += 2 * 10**9
+    assert abs(clock.get_time() - start - 2) < 1e-6
+    assert abs(clock.get_sidereal_seconds() - 3600 - 2 * 1.00273790935) < 1e-6
+
+
+def test_sidereal_time_agrees_with_astropy():
+    pytest.importorskip("astropy")
+    for epoch_time in [1_704_067_200.0, 1_735_689_600.0, 1_750_000_000.0]:
+        error = local_sidereal_time(epoch_time) - astropy_sidereal_time(epoch_time)
+        assert abs((error + 43200) % 86400 - 43200) < 0.2
+
+
+def test_iers_stays_offline():
+    pytest.importorskip("astropy")
+    from astropy.utils import data, iers
+
+    age = configure_iers()
+    assert not iers.conf.auto_download and not data.conf.allow_internet
+    assert age > 0
+    with pytest.warns(Warning):  # Past the end of the table, but no error
+        astropy_sidereal_time(2_500_000_000.0)
+
+
+def test_calibration_never_tears_a_reading():
+    clock = SuperClock(sidereal_time=40000)
+    readings = []
+    done = threading.Event()
+
+    def read():  # Like the acquisition thread stamping samples
+        while not done.is_set():
+            readings.append(clock.get_sidereal_seconds())
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for _ in range(2000):
+        clock.calibrate_sidereal_time(clock.get_sidereal_seconds())
+    done.set()
+    reader.join()
+
+    assert min(readings) >= 40000 and max(readings) < 40000 + 60
@@ -0,0 +1,59 @@
+import struct
+import time
+
+import numpy as np
+import pytest
+
+from tools import MiniTars, Tars
+from _tools.tars import channel_scales, decode_block
+
+
+def test_decode_block_keeps_channels_aligned():
+    scales = channel_scales([0x0100, 0x0101])
+    counts = [0, 16384, -16384, 32767, 100, -100]
+    stream = struct.pack("<6h", *counts)
+
+    # Split mid-word and mid-frame; every chunk must carry over the partial frame
+    decoded = []
+    remainder = b""
+    for chunk in [stream[:3], stream[3:7], stream[7:]]:
+        block, remainder = decode_block(remainder + chunk, scales)
+        decoded.append(block)
+
+    volts = np.concatenate(decoded)
+    assert remainder == b""
+    assert volts.shape == (3, 2)
+    expected = 5 + np.array(counts).reshape(-1, 2) * Tars.RANGE_VOLT[1] / 32768
+    assert np.allclose(volts, expected)
+
+
+def test_decode_block_empty():
+    block, remainder = decode_block(b"\x01", channel_scales([0x0100, 0x0101]))
+    assert block.shape == (0, 2)
+    assert remainder == b"\x01"
+
+
+class Window:
+    """Threepio, as far as the devices can see; its widgets belong to the GUI thread"""
+
+    def log(self, message: str):
+        pass
+
+    @property
+    def ui(self):
+        raise AssertionError("widgets read off the GUI thread")
+
+
+def test_simulated_data_reads_settings_not_widgets(monkeypatch):
+    monkeypatch.setattr(time, "time", lambda: 1_700_000_000.0)
+    tars = Tars(Window())
+    tars.noise = 0
+    off = tars.random_data()
+    tars.calibration = True
+    on = tars.random_data()
+    assert on.a - off.a == pytest.approx(1 + 1 / 272)
+
+    minitars = MiniTars(Window())
+    minitars.dec_auto = False
+    minitars.dec = 12
+    assert minitars.random_data() == 12.0
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from tools import AsyncWriter, MyPrecious
+
+
+class Flaky:
+    """A file that fails once 'fail_after' lines are written, like a full disk"""
+
+    def __init__(self, fail_after: int | None = None):
+        self.lines: list[str] = []
+        self.fail_after = fail_after
+        self.closed = False
+        self.threads: set[str] = set()
+
+    def write(self, line: str):
+        self.threads.add(threading.current_thread().name)
+        if self.fail_after is not None and len(self.lines) >= self.fail_after:
+            raise OSError(28, "No space left on device")
+        self.lines.append(line)
+
+    def close(self):
+        self.closed = True
+
+
+def test_lines_are_written_in_order_then_closed(tmp_path):
+    writer = AsyncWriter(max_queue=16)  # Small enough to make write() wait
+    writer.start()
+    a, b = MyPrecious("a.md1", str(tmp_path)), MyPrecious("b.md1", str(tmp_path))
+    for i in range(1000):
+        writer.write(a, str(i))
+        writer.write(b, str(-i))
+    writer.close_files(a, b)
+    writer.stop()
+
+    assert not writer.is_alive()
+    assert a.closed and b.closed
+    assert (tmp_path / "a.md1").read_text().split() == [str(i) for i in range(1000)]
+    assert (tmp_path / "b.md1").read_text().split() == [str(-i) for i in range(1000)]
+    assert writer.records == 2003  # Including the closes and the stop
+    assert writer.error is None
+
+
+def test_stop_without_start_still_closes():
+    writer = AsyncWriter()
+    file = Flaky()
+    writer.write(file, "1")
+    writer.close_files(file)
+    writer.stop()
+
+    assert file.lines == ["1"] and file.closed
+
+
+def test_failure_reaches_the_caller_without_blocking():
+    writer = AsyncWriter(max_queue=4)
+    writer.start()
+    file = Flaky(fail_after=10)
+
+    sent = 0
+    with pytest.raises(OSError):  # Long before the queue could block forever
+        for i in range(100):
+            sent += 1
+            writer.write(file, str(i))
+    writer.join(timeout=1)
+
+    assert not writer.is_alive()
+    assert isinstance(writer.error, OSError)
+    assert "No space left" in writer.get_report()
+    assert file.lines == [str(i) for i in range(10)]  # In order, none skipped
+
+    # Once there's room again, writing carries on in the caller's thread, with
+    # nothing lost
+    file.fail_after = None
+    writer.write(file, "last")
+    writer.close_files(file)
+    writer.stop()
+    assert file.lines == [str(i) for i in range(sent)] + ["last"]
+    assert file.closed
+    assert threading.current_thread().name in file.threads
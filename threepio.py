@@ -1,6 +1,7 @@
+import threading
 import time
 from enum import Enum
-from functools import reduce
+from functools import partial, reduce
 from typing import Callable
 from math import floor
 
@@ -16,6 +17,7 @@ from tools import (
     Spectrum,
     SuperClock,
     GB_LATITUDE,
+    configure_iers,
     Tars,
     MiniTars,
     discovery,
@@ -24,6 +26,15 @@ from tools import (
     Alert,
     DecCalc,
     ObsType,
+    SampleRing,
+    Acquisition,
+    RawCapture,
+    Stripchart,
+    Profiler,
+    TIME,
+    DEC,
+    A,
+    B,
 )
 
 
@@ -35,13 +46,29 @@ class Threepio(QtWidgets.QMainWindow):
 
     # Basic time
     BASE_PERIOD = 10  # ms = 100Hz
+    SAMPLE_RETENTION_SECONDS = 600  # Samples kept in memory for display & analysis
     GUI_UPDATE_PERIOD = 1000  # ms = 1Hz
     STRIPCHART_PERIOD = 16.7  # ms = 60Hz
 
+    # Data
+    RAW_CAPTURE = False  # Record every sample of each observation to "*_raw.bin"
+    INTEGRATE = True  # Write the mean of all samples between writes
+    INTEGRATION_STATS = False  # Also write min/max/std of each window to "*_stats"
+    DECIMATE = False  # Anti-alias filter the samples instead of integrating them
+    ASYNC_WRITES = True  # Write observation files from a background thread
+    BINARY_OUTPUT = False  # Also write each observation in binary to "*.mdb1/2"
+
+    # Diagnostics
+    SIDEREAL_TOLERANCE = 1.0  # s from astropy's sidereal time before warning
+    IERS_MAX_AGE = 365  # days; the IERS-A table's predictions run out after this
+    PROFILE = False  # Time each stage of the main loop; shown in testing mode
+    PROFILE_FILE = "profile.txt"  # Where the timings are written on quit
+
     # Style
     BLUE = 0x2196F3
     RED = 0xFF5252
     MIN_WIDTH = 860
+    DEC_VIEW_THRESHOLD = 0.05  # Degrees the dish must move before it is redrawn
 
     class Mode(Enum):
         NORMAL = 0
@@ -69,15 +96,13 @@ class Threepio(QtWidgets.QMainWindow):
         stripchart_log_task = self.log(">>> Initializing...")
         # Clock
         self.clock = SuperClock()
+        self.profiler = Profiler(self.PROFILE)
 
         # Initialize stripchart
         self.stripchart_display_seconds = 8
-        self.should_clear_stripchart = False
         self.channel_visibility = (True, True)
-        self.stripchart_series_a = QtChart.QLineSeries()
-        self.stripchart_series_b = QtChart.QLineSeries()
-        self.axis_y = QtChart.QValueAxis()
         self.chart = QtChart.QChart()
+        self.stripchart = Stripchart(self.chart, (self.BLUE, self.RED))
         self.ui.stripchart.setRenderHint(QtGui.QPainter.Antialiasing)
         self.initialize_stripchart()  # Should this include more of the above?
 
@@ -124,24 +149,34 @@ class Threepio(QtWidgets.QMainWindow):
         self.tars.start()
         self.minitars = MiniTars(parent=self, device=declinometer)
         self.minitars.start()
+        self.connect_testing_frame()
 
         # Establish observation
         self.obs = None
+        self.raw_capture = None
         self.ui_thinks_obs_is_set = False
         self.completed_one_calibration = False
 
-        # Establish data array & most recent dec
-        self.data = []
+        # Most recent data point & dec
         self.current_dec = 0.0
         self.current_data_point = None
 
         # Tars communication interpretation
         self.previous_transmission = None
 
+        # Samples published by the acquisition thread, which also serve as the
+        # store of recent data; each consumer follows them with its own cursor
+        self.samples = SampleRing(
+            int(self.SAMPLE_RETENTION_SECONDS * self.tars.SAMPLE_RATE)
+        )
+        self.data_feed = self.samples.subscribe()
+        self.stripchart_feed = self.samples.subscribe()
+        self.voltage_feed = self.samples.subscribe()
+
         # Telescope visualization
         self.dec_scene = QtWidgets.QGraphicsScene()
         self.ui.dec_view.setScene(self.dec_scene)
-        self.update_dec_view()
+        self.initialize_dec_view()
 
         # Initial dec calibration
         self.dec_calc = DecCalc()
@@ -150,6 +185,14 @@ class Threepio(QtWidgets.QMainWindow):
         except FileNotFoundError:
             self.alert(Alert("Dec must be calibrated", "Got it"))
 
+        self.profile_stages()
+
+        # Hand the serial ports over to the acquisition thread
+        self.acquisition = Acquisition(
+            self.tars, self.minitars, self.dec_calc, self.clock, self.samples
+        )
+        self.acquisition.start()
+
         # Primary clock
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self.tick)  # Do everything
@@ -160,14 +203,29 @@ class Threepio(QtWidgets.QMainWindow):
                                                self.update_data,
                                                name="update_data")
 
-        # Measure refresh rate
+        # The stripchart & telescope are redrawn at the display rate, however fast
+        # data comes in
+        self.display_timer = QtCore.QTimer(self)
+        self.display_timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.display_timer.timeout.connect(self.update_stripchart)
+        self.display_timer.timeout.connect(self.update_dec_view)
+        self.display_timer.start(round(self.STRIPCHART_PERIOD))
+
+        # Measure acquisition & render rates
+        self.ui.refresh_label.setText("Acquisition / chart:")
         self.time_of_last_fps_update = time.perf_counter()
-        self.ticks_since_last_fps_update = 0
+        self.samples_since_last_fps_update = 0
+        self.frames_since_last_fps_update = 0
 
         # Alert user that threepio is done initializing
         stripchart_log_task.set_status(0)
         self.message("Ready!!!")
 
+        # Check the sidereal time against astropy without holding up startup
+        threading.Thread(
+            target=self.check_sidereal_time, name="sidereal check", daemon=True
+        ).start()
+
     def tick(self):
         """
         Primary controller for each clock tick. Fires as fast as possible up to 100Hz.
@@ -175,37 +233,28 @@ class Threepio(QtWidgets.QMainWindow):
         else should be assigned to a timer.
         """
 
-        # Attempt to grab latest data point; it won't always be written to the data file
-        tars_datum = self.tars.read_latest()  # Get data from DAQ
-        minitars_datum = self.minitars.read_latest()  # Get data from Arduino
-        sidereal_timestamp = self.clock.get_sidereal_seconds()
-
-        # If data was available above, save it
-        if tars_datum is not None and minitars_datum is not None:
-            assert tars_datum
-            assert minitars_datum
-            self.current_dec = self.dec_calc.calculate_declination(minitars_datum)
-            self.current_data_point = DataPoint(  # Create data point
-                sidereal_timestamp,  # RA
-                self.current_dec,  # Dec
-                tars_datum.a,  # Channel A
-                tars_datum.b,  # Channel B
-            )
-            self.data.append(self.current_data_point)  # Add to data list
+        # Collect everything the acquisition thread has published since last tick;
+        # the latest point won't always be written to the data file
+        rows = self.data_feed.poll()
+        self.samples_since_last_fps_update += len(rows)  # For measuring rates
+        if len(rows) > 0:
+            row = rows[-1]
+            self.current_data_point = DataPoint(row[TIME], row[DEC], row[A], row[B])
+            self.current_dec = self.current_data_point.dec
+            if self.obs is not None:
+                self.obs.accumulate(rows)
 
         self.clock.run_timers()  # Run all timers that are due
 
-        # Update every tick
-        self.update_stripchart()
-        self.update_dec_view()
-
-        self.ticks_since_last_fps_update += 1  # For measuring fps
-
     def update_data(self) -> None:
         if not self.check_and_set_observation_state():
             return
         assert self.obs is not None  # The language server was complaining
 
+        if self.obs.raw_capture and self.raw_capture is None:
+            self.raw_capture = RawCapture(self.obs.name + "_raw.bin", self.samples)
+            self.raw_capture.start()
+
         period = 1000 / self.obs.freq  # Hz -> ms
         self.data_timer.set_period(period)
 
@@ -268,7 +317,10 @@ class Threepio(QtWidgets.QMainWindow):
         elif transmission is Comm.FINISHED:
             self.obs.next()
             self.message(f"{obs_type.name.capitalize()} complete!!!")
+            if self.obs.writer is not None:
+                self.log(f"Writer: {self.obs.writer.get_report()}")
             self.obs = None
+            self.stop_raw_capture()
         elif transmission is Comm.SEND_TEL_NORTH:
             self.message("Send telescope NORTH at max speed!!!", beep=False, log=False)
             should_beep = True
@@ -293,6 +345,49 @@ class Threepio(QtWidgets.QMainWindow):
 
         self.previous_transmission = transmission
 
+    def stop_raw_capture(self):
+        if self.raw_capture is not None:
+            self.raw_capture.stop()
+            self.log(f"Captured {self.raw_capture.samples_written} raw samples")
+            if self.raw_capture.samples.dropped > 0:
+                self.log(
+                    f"Raw capture fell behind and lost "
+                    f"{self.raw_capture.samples.dropped} samples"
+                )
+            self.raw_capture = None
+
+    def connect_testing_frame(self):
+        """Keep the simulated signal in step with the testing frame. The devices are
+        read on the acquisition thread, which mustn't touch widgets, so each setting
+        is copied over whenever it changes."""
+        for widget, device, name in [
+            (self.ui.noise_dial, self.tars, "noise"),
+            (self.ui.variance_dial, self.tars, "variance"),
+            (self.ui.polarization_dial, self.tars, "polarization"),
+            (self.ui.calibration_check_box, self.tars, "calibration"),
+            (self.ui.dec_auto_check_box, self.minitars, "dec_auto"),
+            (self.ui.declination_slider, self.minitars, "dec"),
+        ]:
+            if isinstance(widget, QtWidgets.QCheckBox):
+                signal, value = widget.toggled, widget.isChecked()
+            else:
+                signal, value = widget.valueChanged, widget.value()
+            setattr(device, name, value)
+            signal.connect(partial(setattr, device, name))
+
+    def check_acquisition(self):
+        """Report what went wrong on the acquisition thread since the last check"""
+        error = self.acquisition.take_error()
+        if error is None:
+            return
+        if self.acquisition.failed:
+            self.log(f"Acquisition stopped: {error!r}", warning=True)
+            self.alert(
+                Alert("Lost the DATAQ or declinometer; restart Threepio", "Okay")
+            )
+        else:
+            self.log(f"Acquisition error: {error!r}", warning=True)
+
     def set_state_normal(self):
         self.ui.actionNormal.setChecked(True)
         self.ui.actionTesting.setChecked(False)
@@ -362,10 +457,38 @@ class Threepio(QtWidgets.QMainWindow):
                 str(self.obs.sweep_number) if self.obs.sweep_number != -1 else "n/a"
             )  # Sweep number
 
+        self.check_acquisition()
         self.update_progress_bar()
         self.update_fps()
         self.update_console()
         self.update_voltage()
+        if self.profiler.enabled:
+            self.profile_label.setText(self.profiler.get_report())
+
+    def profile_stages(self):
+        """Time every stage of the main loop and of the acquisition thread, and show
+        the timings in the testing frame; does nothing unless profiling"""
+        if not self.profiler.enabled:
+            return
+        for owner, name in [
+            (self.tars, "read_block"),
+            (self.minitars, "read_latest"),
+            (self.dec_calc, "calculate_declination"),
+            (self, "tick"),
+            (self.clock, "run_timers"),
+            (self, "update_gui"),
+            (self, "update_data"),
+            (self, "update_stripchart"),
+            (self, "update_dec_view"),
+        ]:
+            stage = f"{type(owner).__name__}.{name}"
+            setattr(owner, name, self.profiler.wrap(stage, getattr(owner, name)))
+
+        self.profile_label = QtWidgets.QLabel(self.ui.testing_frame)
+        self.profile_label.setFont(
+            QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont)
+        )
+        self.ui.gridLayout_8.addWidget(self.profile_label, 1, 0, 1, 2)
 
     def update_progress_bar(self):
         try:
@@ -373,8 +496,7 @@ class Threepio(QtWidgets.QMainWindow):
             (start_time, end_time) = self.obs.state_time_interval # type: ignore
             
             if end_time > 0.0:
-                # print(f"{start_time=}, {end_time=}, {time.time()=}")
-                current_time = time.time()
+                current_time = self.clock.get_time()
 
                 val = 0
                 if end_time > current_time > start_time and start_time > 0:
@@ -403,46 +525,53 @@ class Threepio(QtWidgets.QMainWindow):
             self.ui.progressBar.setFormat("n/a")
             self.ui.progressBar.setValue(0)
 
-    def update_dec_view(self):
-        angle = self.current_dec - GB_LATITUDE
-
+    def initialize_dec_view(self):
         # Telescope dish
         dish = QtGui.QPixmap("assets/dish.png")
-        dish = QtWidgets.QGraphicsPixmapItem(dish)
-        dish.setTransformOriginPoint(32, 32)
-        dish.setTransformationMode(QtCore.Qt.SmoothTransformation) # type: ignore
-        dish.setY(16)
-        dish.setRotation(angle)
+        self.dish = QtWidgets.QGraphicsPixmapItem(dish)
+        self.dish.setTransformOriginPoint(32, 32)
+        self.dish.setTransformationMode(QtCore.Qt.SmoothTransformation) # type: ignore
+        self.dish.setY(16)
+        self.dish_angle = None
 
         # Telescope base
         base = QtGui.QPixmap("assets/base.png")
         base = QtWidgets.QGraphicsPixmapItem(base)
         base.setTransformationMode(QtCore.Qt.SmoothTransformation) # type: ignore
 
-        self.dec_scene.clear()
-        for i in [dish, base]:
+        for i in [self.dish, base]:
             self.dec_scene.addItem(i)
+        self.update_dec_view()
+
+    def update_dec_view(self):
+        angle = self.current_dec - GB_LATITUDE
+        if (
+            self.dish_angle is not None
+            and abs(angle - self.dish_angle) < self.DEC_VIEW_THRESHOLD
+        ):
+            return
+        self.dish.setRotation(angle)
+        self.dish_angle = angle
 
     def update_fps(self):
-        """Updates the fps counter to display current refresh rate"""
+        """Updates the counter to display the current acquisition and render rates"""
         current_time = time.perf_counter()
         time_since_last_fps_update = current_time - self.time_of_last_fps_update
 
         try:
-            new_fps = "%.2fHz" % (
-                self.ticks_since_last_fps_update / time_since_last_fps_update
+            new_fps = "%.2fHz / %.2fHz" % (
+                self.samples_since_last_fps_update / time_since_last_fps_update,
+                self.frames_since_last_fps_update / time_since_last_fps_update,
             )
         except ZeroDivisionError:
             new_fps = "-1.0"
 
         self.ui.refresh_value.setText(new_fps)
         self.time_of_last_fps_update = current_time
-        self.ticks_since_last_fps_update = 0
+        self.samples_since_last_fps_update = 0
+        self.frames_since_last_fps_update = 0
 
     def initialize_stripchart(self):
-        self.chart.addSeries(self.stripchart_series_b)
-        self.chart.addSeries(self.stripchart_series_a)
-
         legend = self.chart.legend()
         if legend is not None:
             legend.hide()
@@ -450,72 +579,32 @@ class Threepio(QtWidgets.QMainWindow):
         self.ui.stripchart.setChart(self.chart)
 
     def update_stripchart(self):
-        try:
-            # Parse latest data point
-            # TODO: This will duplicate points if one fails to read
-            new_a = self.data[len(self.data) - 1].a
-            new_b = self.data[len(self.data) - 1].b
-            new_ra = self.data[len(self.data) - 1].timestamp
-
-            # Add new data point to both series
-            self.stripchart_series_a.append(new_a, new_ra)
-            self.stripchart_series_b.append(new_b, new_ra)
-
-            # We use these value several times
-            current_sideral_seconds = self.clock.get_sidereal_seconds()
-            oldest_y = current_sideral_seconds - self.stripchart_display_seconds
-
-            # Remove the trailing end of the series
-            clear_it = self.should_clear_stripchart  # Prevents a race hazard?
-            for i in [self.stripchart_series_a, self.stripchart_series_b]:
-                if clear_it:
-                    i.clear()
-                elif i.count() > 2 and i.at(1).y() < oldest_y:
-                    i.removePoints(0, 2)
-            self.should_clear_stripchart = False
-
-            # These lines are required to prevent a Qt error
-            self.chart.removeSeries(self.stripchart_series_b)
-            self.chart.removeSeries(self.stripchart_series_a)
-            self.chart.addSeries(self.stripchart_series_b)
-            self.chart.addSeries(self.stripchart_series_a)
-
-            # Check for visibility
-            if self.channel_visibility[0]:
-                pen = QtGui.QPen(QtGui.QColor(self.BLUE))
-            else:
-                pen = QtGui.QPen(QtGui.QColor(0, 0, 0, 0))
-            self.stripchart_series_a.setPen(pen)
-
-            if self.channel_visibility[1]:
-                pen = QtGui.QPen(QtGui.QColor(self.RED))
-            else:
-                pen = QtGui.QPen(QtGui.QColor(0, 0, 0, 0))
-            self.stripchart_series_b.setPen(pen)
+        self.frames_since_last_fps_update += 1  # For measuring render rate
 
-            axis_y = QtChart.QValueAxis()
-            axis_y.setMin(oldest_y)
-            axis_y.setMax(current_sideral_seconds)
-            axis_y.setVisible(False)
-
-            self.chart.setAxisY(axis_y)
-            self.stripchart_series_a.attachAxis(axis_y)
-            self.stripchart_series_b.attachAxis(axis_y)
+        # Every sample published since the last frame, each exactly once
+        self.stripchart.add(self.stripchart_feed.poll())
+        if len(self.stripchart) == 0:  # No data yet
+            return
 
-        except IndexError:  # No data yet
-            pass
+        self.stripchart.set_visibility(self.channel_visibility)
+        self.stripchart.draw(
+            self.clock.get_sidereal_seconds(),
+            self.stripchart_display_seconds,
+            self.ui.stripchart.height(),  # The time axis runs down the chart
+        )
 
     def toggle_channels(self):
         a, b = self.channel_visibility
         self.channel_visibility = (b, a != b)
 
     def clear_stripchart(self):
-        self.should_clear_stripchart = True
+        self.stripchart.clear()
 
     def update_voltage(self):
-        if len(self.data) > 0:
-            self.ui.channelA_value.setText("%.4fV" % self.data[len(self.data) - 1].a)
-            self.ui.channelB_value.setText("%.4fV" % self.data[len(self.data) - 1].b)
+        rows = self.voltage_feed.poll()
+        if len(rows) > 0:
+            self.ui.channelA_value.setText("%.4fV" % rows[-1, A])
+            self.ui.channelB_value.setText("%.4fV" % rows[-1, B])
 
     def handle_survey(self):
         obs = Survey()
@@ -530,6 +619,12 @@ class Threepio(QtWidgets.QMainWindow):
         self.new_observation(obs)
 
     def new_observation(self, obs: Observation):
+        obs.set_clock(self.clock)
+        obs.set_raw_capture(self.RAW_CAPTURE)
+        obs.set_async_writes(self.ASYNC_WRITES)
+        obs.set_binary(self.BINARY_OUTPUT)
+        obs.set_integration(self.INTEGRATE, self.INTEGRATION_STATS)
+        obs.set_decimation(self.tars.SAMPLE_RATE if self.DECIMATE else None)
         dialog = ObsDialog(self, obs, self.clock)
         try:
             dialog.setWindowTitle("New " + obs.obs_type.name.capitalize())
@@ -545,7 +640,7 @@ class Threepio(QtWidgets.QMainWindow):
         dialog.exec_()
 
     def dec_calibration(self):
-        dialog = DecDialog(self.minitars, self)
+        dialog = DecDialog(self.acquisition, self)
         if self.mode is Threepio.Mode.TESTING:
             dialog.show()
         dialog.exec_()
@@ -557,6 +652,20 @@ class Threepio(QtWidgets.QMainWindow):
         dialog.show()
         dialog.exec_()
 
+    def check_sidereal_time(self):
+        """Log the age of astropy's IERS table and how far the clock's sidereal time
+        is from astropy's, if astropy is installed"""
+        try:
+            age = configure_iers()  # Before astropy gets a chance to go online
+            error = self.clock.get_sidereal_error()
+        except ImportError:
+            return
+        self.log(f"IERS table is {age:.0f} days old", warning=age > self.IERS_MAX_AGE)
+        self.log(
+            f"Sidereal time is {error:+.2f}s from astropy's",
+            warning=abs(error) > self.SIDEREAL_TOLERANCE,
+        )
+
     def message(self, message, beep=True, log=True):
         if log:
             self.log(message)
@@ -638,10 +747,10 @@ class Threepio(QtWidgets.QMainWindow):
 
     def beep(self, message=""):
         """Make beep play for user. Message param is only for debugging."""
-        if time.time() - self.last_beep_time > 0.1:
+        if self.clock.get_time() - self.last_beep_time > 0.1:
             # self.beep_sound.play()
-            self.last_beep_time = time.time()
-            print("beep!", message, time.time())
+            self.last_beep_time = self.clock.get_time()
+            print("beep!", message, self.last_beep_time)
 
     def closeEvent(self, event):  # type: ignore
         """Override quit action to confirm before closing"""
@@ -655,6 +764,12 @@ class Threepio(QtWidgets.QMainWindow):
 
         close = quit_dialog.exec()
         if close:
+            if self.obs is not None:
+                self.obs.close_file()  # Keep what has been observed so far
+            self.stop_raw_capture()
+            self.acquisition.stop()
+            if self.profiler.enabled:
+                self.profiler.dump(self.PROFILE_FILE)
             event.accept()
         else:
             event.ignore()
@@ -2,14 +2,29 @@
 from _tools.comm import Comm
 from _tools.datapoint import DataPoint
 from _tools.precious import MyPrecious
-from _tools.superclock import SuperClock, GB_LATITUDE, GB_LONGITUDE
+from _tools.writer import AsyncWriter
+from _tools.segindex import SegmentIndex, load_index
+from _tools.mdbinary import BinaryPrecious, MdBinary, load_binary
+from _tools.mdreader import SegmentChunk, read_segments, read_segment, read_meta
+from _tools.mdreader import find_segments, read_indexed_segment
+from _tools.superclock import SuperClock, VirtualClock, GB_LATITUDE, GB_LONGITUDE
+from _tools.superclock import local_sidereal_time, astropy_sidereal_time
+from _tools.superclock import configure_iers
 from _tools.tars import Tars, discovery
 from _tools.logtask import LogTask
 from _tools.minitars import MiniTars
 from _tools.obsrecord import ObsRecord
 from _tools.alert import Alert
+from _tools.samplering import SampleRing, Subscription, TIME, RAW_DEC, DEC, A, B
+from _tools.integrator import Integrator
+from _tools.decimator import Decimator
 from _tools.observation import Observation, ObsType
 from _tools.scan import Scan
 from _tools.survey import Survey
 from _tools.spectrum import Spectrum
 from _tools.deccalc import DecCalc
+from _tools.acquisition import Acquisition
+from _tools.rawcapture import RawCapture, load_raw_capture
+from _tools.stripchart import Stripchart, minmax_envelope
+from _tools.simulation import SimulatedTelescope, Simulation
+from _tools.profiler import Histogram, Profiler